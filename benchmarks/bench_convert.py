@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+#Benchmarks for type conversion of options. Run with `python3 benchmarks/bench_convert.py`.
+import argparse
+import time
+from inlog import Logger, Schema, Field
+
+def timeit(func, repeat=3):
+    best=float("inf")
+    for _ in range(repeat):
+        start=time.perf_counter()
+        func()
+        best=min(best, time.perf_counter()-start)
+    return best
+
+def bench_convert_array(n, dtype):
+    values=",".join(str(dtype(i*0.5)) for i in range(n))
+    print(f"convert_array({dtype.__name__}), {n} values")
+    def convert(as_numpy):
+        logger=Logger({"grid": values}, hash_cache=False)
+        logger.convert_array(dtype, "grid", as_numpy=as_numpy)
+    python=timeit(lambda: convert(False))
+    print(f"{'python':<10} {python:>10.4f} s")
+    numpy=timeit(lambda: convert(True))
+    print(f"{'numpy':<10} {numpy:>10.4f} s {python/numpy:>8.2f}x")
+
+def bench_schema(sections, options):
+    config={f"section{i}": {f"option{j}": str(j) for j in range(options)} for i in range(sections)}
+    types={f"section{i}": {f"option{j}": int if j%2 else Field(float, array=True) for j in range(options)} for i in range(sections)}
+    print(f"Conversion of {sections}x{options} options")
+    def convert_each():
+        logger=Logger(config, hash_cache=False)
+        for i in range(sections):
+            for j in range(options):
+                if j%2:
+                    logger.convert_type(int, f"section{i}", f"option{j}")
+                else:
+                    logger.convert_array(float, f"section{i}", f"option{j}")
+    schema=Schema(types)
+    def convert_schema():
+        logger=Logger(config, hash_cache=False)
+        logger.apply_schema(schema)
+    old=timeit(convert_each)
+    print(f"{'convert_type/convert_array':<28} {old:>10.4f} s")
+    new=timeit(convert_schema)
+    print(f"{'apply_schema':<28} {new:>10.4f} s {old/new:>8.2f}x")
+
+def main():
+    parser=argparse.ArgumentParser(description="Benchmark type conversion of options")
+    parser.add_argument("--values", type=int, default=1000000)
+    args=parser.parse_args()
+    bench_schema(10, 50)
+    n=1000
+    while n<=args.values:
+        bench_convert_array(n, int)
+        bench_convert_array(n, float)
+        n*=10
+
+if __name__ == "__main__":
+    main()
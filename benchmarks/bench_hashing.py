@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+#Benchmarks for hashing output files. Run with `python3 benchmarks/bench_hashing.py`.
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from inlog import hashing
+
+def make_files(directory, n, size):
+    files=[]
+    for i in range(n):
+        f=Path(directory)/f"file{i}.dat"
+        with open(f, "wb") as fh:
+            fh.write(os.urandom(size))
+        files.append(f)
+    return files
+
+def timeit(func, repeat=3):
+    best=float("inf")
+    for _ in range(repeat):
+        start=time.perf_counter()
+        func()
+        best=min(best, time.perf_counter()-start)
+    return best
+
+def bench_parallel(directory, size, workers):
+    print(f"Parallel hashing, {size/2**20:.1f} MiB per file, no cache")
+    print(f"{'files':>6} {'workers':>8} {'time [s]':>10} {'speedup':>8}")
+    for n in [1, 8, 64, 512]:
+        files=make_files(directory, n, size)
+        serial=timeit(lambda: hashing.hash_files(files, max_workers=1))
+        print(f"{n:>6} {1:>8} {serial:>10.4f} {1:>8.2f}")
+        for executor in ["thread", "process"]:
+            t=timeit(lambda: hashing.hash_files(files, max_workers=workers, executor=executor))
+            print(f"{n:>6} {str(workers)+executor[0]:>8} {t:>10.4f} {serial/t:>8.2f}")
+        for f in files:
+            f.unlink()
+
+def bench_block_size(directory, size):
+    print(f"Block size, one file of {size/2**20:.1f} MiB")
+    print(f"{'block size':>12} {'time [s]':>10} {'MiB/s':>8}")
+    f=make_files(directory, 1, size)[0]
+    for block_size in [None, 1<<16, 1<<18, 1<<20, 1<<22]:
+        t=timeit(lambda: hashing.hash_file(f, block_size=block_size))
+        print(f"{str(block_size):>12} {t:>10.4f} {size/2**20/t:>8.1f}")
+    f.unlink()
+
+def bench_algorithms(directory, size):
+    print(f"Hash algorithms, one file of {size/2**20:.1f} MiB")
+    print(f"{'algorithm':>12} {'time [s]':>10} {'MiB/s':>8}")
+    f=make_files(directory, 1, size)[0]
+    for algorithm in hashing.ALGORITHMS:
+        t=timeit(lambda: hashing.hash_file(f, algorithm))
+        print(f"{algorithm:>12} {t:>10.4f} {size/2**20/t:>8.1f}")
+    f.unlink()
+
+def main():
+    parser=argparse.ArgumentParser(description="Benchmark hashing of output files")
+    parser.add_argument("--size", type=float, default=4, help="file size in MiB")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--large", type=float, default=256, help="file size in MiB for the block size benchmark")
+    args=parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        bench_parallel(directory, int(args.size*2**20), args.workers)
+        bench_block_size(directory, int(args.large*2**20))
+        bench_algorithms(directory, int(args.large*2**20))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+#Benchmarks for loading config files. Run with `python3 benchmarks/bench_loaders.py`.
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+import inlog
+from inlog import loaders
+
+def timeit(func, repeat=3):
+    best=float("inf")
+    for _ in range(repeat):
+        start=time.perf_counter()
+        func()
+        best=min(best, time.perf_counter()-start)
+    return best
+
+def make_config(sections, options):
+    return {f"section{i}": {f"option{j}": f"value{i}_{j}" for j in range(options)} for i in range(sections)}
+
+def write_configs(directory, config):
+    files={}
+    files["json"]=Path(directory)/"config.json"
+    files["json"].write_text(json.dumps(config))
+    files["ini"]=Path(directory)/"config.ini"
+    files["ini"].write_text("".join(f"[{s}]\n"+"".join(f"{k}={v}\n" for k, v in section.items()) for s, section in config.items()))
+    if loaders._has_yaml:
+        files["yaml"]=Path(directory)/"config.yaml"
+        files["yaml"].write_text(loaders.yaml.safe_dump(config))
+    return files
+
+def bench_cache(directory, sections, options):
+    files=write_configs(directory, make_config(sections, options))
+    print(f"Repeated loading, {sections}x{options} options")
+    print(f"{'format':>6} {'size [KB]':>10} {'parse [s]':>10} {'cached [s]':>10} {'speedup':>8}")
+    for fmt, f in files.items():
+        load=getattr(inlog, "load_"+fmt)
+        parse=timeit(lambda: load(f))
+        load(f, cache=True)
+        cached=timeit(lambda: load(f, cache=True))
+        print(f"{fmt:>6} {f.stat().st_size/1e3:>10.1f} {parse:>10.4f} {cached:>10.4f} {parse/cached:>8.2f}")
+
+def bench_backends(directory, sizes, max_python_yaml):
+    print("Parsers for config files")
+    print(f"{'size [KB]':>10} {'parser':>20} {'time [s]':>10} {'MB/s':>8}")
+    for size in sizes:
+        config=make_config(max(1, int(size)//2500), 100) #about 25 bytes per option
+        files=write_configs(directory, config)
+        backends=[("json", files["json"], lambda f: json.loads(f.read_bytes()))]
+        if loaders._has_orjson:
+            backends.append(("orjson", files["json"], lambda f: loaders.orjson.loads(f.read_bytes())))
+        if loaders._has_yaml:
+            if files["yaml"].stat().st_size<=max_python_yaml:
+                backends.append(("yaml.SafeLoader", files["yaml"], lambda f: loaders.yaml.load(f.read_text(), Loader=loaders.yaml.SafeLoader)))
+            if hasattr(loaders.yaml, "CSafeLoader"):
+                backends.append(("yaml.CSafeLoader", files["yaml"], lambda f: loaders.yaml.load(f.read_text(), Loader=loaders.yaml.CSafeLoader)))
+        for name, f, parse in backends:
+            t=timeit(lambda: parse(f), repeat=1 if size>1e6 else 3)
+            file_size=f.stat().st_size
+            print(f"{file_size/1e3:>10.1f} {name:>20} {t:>10.4f} {file_size/1e6/t:>8.2f}")
+
+def main():
+    parser=argparse.ArgumentParser(description="Benchmark loading of config files")
+    parser.add_argument("--sections", type=int, default=100)
+    parser.add_argument("--options", type=int, default=100)
+    parser.add_argument("--max-size", type=float, default=50, help="largest config in MB for the parser benchmark")
+    parser.add_argument("--max-python-yaml", type=float, default=1, help="largest config in MB parsed with the pure python yaml loader")
+    args=parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        bench_cache(directory, args.sections, args.options)
+        sizes=[s for s in [1e3, 1e4, 1e5, 1e6, 1e7, 5e7] if s<=args.max_size*1e6]
+        bench_backends(directory, sizes, args.max_python_yaml*1e6)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+#Benchmarks for option access and tree operations. Run with `python3 benchmarks/bench_tree.py`.
+import argparse
+import timeit
+import tracemalloc
+from inlog import Logger
+from inlog.Tree import TreeNode
+
+def make_config(width, depth):
+    """Nested config with width**depth leafs."""
+    if depth==0:
+        return "1.0"
+    return {f"key{i}": make_config(width, depth-1) for i in range(width)}
+
+def bench(name, stmt, number):
+    t=min(timeit.repeat(stmt, number=number, repeat=5))/number
+    print(f"{name:<40} {t*1e6:>10.3f} us")
+    return t
+
+def bench_get(width, depth, number):
+    print(f"Option access, config with {width}**{depth} leafs")
+    config=make_config(width, depth)
+    logger=Logger(config)
+    keys=tuple(f"key{width-1}" for _ in range(depth))
+    options=TreeNode.from_leafdict(config)
+    accessed=options.copy()
+    def tree_get():
+        #the access path before the flat index: recursive TreeNode.get on the options and a mirrored accessed tree
+        value=options.get(*keys).to_leafdict()
+        accessed.set_all(True, *keys)
+        return value
+    old=bench("TreeNode.get + set_all", tree_get, number)
+    new=bench("Logger.get (path index)", lambda: logger.get(*keys), number)
+    print(f"{'speedup':<40} {old/new:>10.2f}")
+
+def bench_getitem(width, depth, number):
+    print(f"Bracket access, config with {width}**{depth} leafs")
+    config=make_config(width, depth)
+    logger=Logger(config)
+    key=f"key{width-1}"
+    options=TreeNode.from_leafdict(config)
+    accessed=options.copy()
+    def tree_getitem():
+        #bracket access before the match index: depth-first search in both trees
+        value=options.match_depth_first(key, key).to_leafdict()
+        accessed.match_depth_first(key, key).set_all(True)
+        return value
+    old=bench("TreeNode.match_depth_first", tree_getitem, number)
+    new=bench("Logger.__getitem__ (match index)", lambda: logger[key, key], number)
+    print(f"{'speedup':<40} {old/new:>10.2f}")
+
+def bench_get_many(width, depth, number):
+    print(f"Access of 30 options, config with {width}**{depth} leafs")
+    logger=Logger(make_config(width, depth), hash_cache=False)
+    paths=[tuple(f"key{(i+j)%width}" for j in range(depth)) for i in range(30)]
+    def get_each():
+        return tuple(logger.get(*keys) for keys in paths)
+    old=bench("30x Logger.get", get_each, number)
+    new=bench("Logger.get_many", lambda: logger.get_many(*paths), number)
+    print(f"{'speedup':<40} {old/new:>10.2f}")
+
+def bench_view(width, depth, number):
+    print(f"Subtree access, config with {width}**{depth} leafs")
+    logger=Logger(make_config(width, depth), hash_cache=False)
+    old=bench("Logger.get('key0')['key0']", lambda: logger.get("key0")["key0"], number)
+    new=bench("Logger.view('key0')['key0']", lambda: logger.view("key0")["key0"], number)
+    print(f"{'speedup':<40} {old/new:>10.2f}")
+
+def bench_freeze(width, depth, number):
+    print(f"Attribute access on a snapshot, config with {width}**{depth} leafs")
+    logger=Logger(make_config(width, depth), hash_cache=False)
+    frozen=logger.freeze("key0")
+    leaf=frozen.key1
+    class Plain(object):
+        pass
+    plain=Plain()
+    plain.key1=leaf
+    bench("Logger.get", lambda: logger.get("key0", "key1"), number)
+    bench("FrozenOptions attribute", lambda: frozen.key1, number)
+    bench("plain attribute", lambda: plain.key1, number)
+
+def bench_init(width, depth, number):
+    print(f"Logger creation, config with {width}**{depth} leafs")
+    config=make_config(width, depth)
+    def tree_init():
+        #creation before the compact access state: options tree and mirrored accessed tree
+        options=TreeNode.from_leafdict(config)
+        accessed=options.copy()
+        accessed.set_all(False)
+    old=bench("from_leafdict + copy + set_all", tree_init, number)
+    new=bench("Logger()", lambda: Logger(config, hash_cache=False), number)
+    print(f"{'speedup':<40} {old/new:>10.2f}")
+
+def bench_shared_defaults(width, depth, number):
+    print(f"Logger creation with defaults, {width}**{depth} leafs")
+    defaults=make_config(width, depth)
+    shared=TreeNode.from_leafdict(defaults)
+    config={"key0": "2.0"}
+    old=bench("Logger(def_opts=dict)", lambda: Logger(config, def_opts=defaults, hash_cache=False), number)
+    new=bench("Logger(def_opts=TreeNode)", lambda: Logger(config, def_opts=shared, hash_cache=False), number)
+    print(f"{'speedup':<40} {old/new:>10.2f}")
+
+class RecursiveNode(object):
+    """TreeNode before the iterative algorithms: instance dict and recursion."""
+    def __init__(self, value=None, children=None):
+        self.value=value
+        self.children={} if children is None else children
+
+    @classmethod
+    def from_leafdict(cls, leafs):
+        return cls(children={k: cls.from_leafdict(v) if isinstance(v, dict) else cls(v) for k, v in leafs.items()})
+
+    def to_leafdict(self):
+        if len(self.children)==0:
+            return self.value
+        return {k: v.to_leafdict() for k, v in self.children.items()}
+
+    def copy(self):
+        return RecursiveNode(self.value, {k: v.copy() for k, v in self.children.items()})
+
+def memory(func):
+    tracemalloc.start()
+    result=func()
+    size=tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+def bench_tree_ops(n):
+    width=10
+    depth=len(str(n))-1
+    config=make_config(width, depth)
+    print(f"Tree operations, {width}**{depth} leafs")
+    number=max(1, 100000//n)
+    for name, cls in [("recursive", RecursiveNode), ("TreeNode", TreeNode)]:
+        tree=cls.from_leafdict(config)
+        bench(f"{name}.from_leafdict", lambda: cls.from_leafdict(config), number)
+        bench(f"{name}.copy", tree.copy, number)
+        bench(f"{name}.to_leafdict", tree.to_leafdict, number)
+        print(f"{name+' memory':<40} {memory(lambda: cls.from_leafdict(config))/2**20:>10.3f} MiB")
+
+def main():
+    parser=argparse.ArgumentParser(description="Benchmark option access")
+    parser.add_argument("--number", type=int, default=100000)
+    parser.add_argument("--max-nodes", type=float, default=1e6, help="largest tree for the tree operation benchmark")
+    args=parser.parse_args()
+    n=1000
+    while n<=args.max_nodes:
+        bench_tree_ops(n)
+        n*=10
+    for width, depth in [(10, 2), (10, 4), (4, 8)]:
+        bench_get(width, depth, args.number)
+        bench_getitem(width, depth, args.number//10)
+        bench_get_many(width, depth, max(1, args.number//100))
+        bench_view(width, depth, max(1, args.number//100))
+        bench_freeze(width, depth, args.number)
+        bench_init(width, depth, max(1, args.number//10000))
+        bench_shared_defaults(width, depth, max(1, args.number//10000))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+#Benchmarks for writing logs. Run with `python3 benchmarks/bench_write.py`.
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from inlog import Logger, logfiles
+
+def timeit(func, repeat=3):
+    best=float("inf")
+    for _ in range(repeat):
+        start=time.perf_counter()
+        func()
+        best=min(best, time.perf_counter()-start)
+    return best
+
+def make_logger(options):
+    return Logger({f"option{i}": i*0.5 for i in range(options)}, hash_cache=False)
+
+def bench_many(directory, n, options):
+    print(f"Writing {n} logs with {options} options")
+    logger=make_logger(options)
+    new_logs=[Path(directory)/f"data{i}.txt" for i in range(n)]
+    def write_each():
+        #before encoding once: json.dump for every new log
+        log_json=logger._create_log_dict(accessed_only=False)
+        log_json["dependencies"]={}
+        for new in logger._get_logfile_name(new_logs, "log", "append"):
+            with open(new, "w") as newfile:
+                json.dump(log_json, newfile, indent=4, default=logfiles.json_default)
+    old=timeit(write_each)
+    print(f"{'json.dump per log':<24} {old:>10.4f} s")
+    for link in logfiles.LINK_MODES:
+        t=timeit(lambda: logger.write_log(new_logs, accessed_only=False, link=link))
+        print(f"{'write_log link='+str(link):<24} {t:>10.4f} s {old/t:>8.2f}x")
+
+def bench_stream(directory, depth, options):
+    print(f"Writing a log with {options} options and a chain of {depth} dependencies")
+    logger=make_logger(options)
+    old=None
+    for i in range(depth):
+        new=Path(directory)/f"chain{i}.txt"
+        logger.write_log(new, old_logs=old, accessed_only=False)
+        old=new
+    new=Path(directory)/"chain.txt"
+    for stream in (False, True):
+        tracemalloc.start()
+        start=time.perf_counter()
+        logger.write_log(new, old_logs=old, accessed_only=False, stream=stream)
+        t=time.perf_counter()-start
+        peak=tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{'write_log stream='+str(stream):<24} {t:>10.4f} s {peak/2**20:>8.1f} MiB peak")
+
+def bench_dependencies(directory, n, depth, options):
+    print(f"Writing {n} logs depending on the same chain of {depth} logs with {options} options")
+    logger=make_logger(options)
+    old=None
+    for i in range(depth):
+        new=Path(directory)/f"upstream{i}.txt"
+        logger.write_log(new, old_logs=old, accessed_only=False)
+        old=new
+    new_logs=[Path(directory)/f"chunk{i}.txt" for i in range(n)]
+    def write(cache):
+        for new in new_logs:
+            logger.write_log(new, old_logs=old, accessed_only=False, cache_dependencies=cache)
+    uncached=timeit(lambda: write(False))
+    print(f"{'without cache':<24} {uncached:>10.4f} s")
+    t=timeit(lambda: write(True))
+    print(f"{'dependency cache':<24} {t:>10.4f} s {uncached/t:>8.2f}x")
+
+def bench_background(directory, n, options):
+    print(f"Blocking time of writing {n} logs with {options} options")
+    logger=make_logger(options)
+    new_logs=[Path(directory)/f"checkpoint{i}.txt" for i in range(n)]
+    def write(background):
+        for new in new_logs:
+            logger.write_log(new, accessed_only=False, background=background)
+    sync=timeit(lambda: write(False))
+    print(f"{'write_log':<24} {sync:>10.4f} s")
+    t=timeit(lambda: write(True))
+    print(f"{'background=True':<24} {t:>10.4f} s {sync/t:>8.2f}x")
+    logger.close()
+
+def main():
+    parser=argparse.ArgumentParser(description="Benchmark writing of logs")
+    parser.add_argument("--logs", type=int, default=100)
+    parser.add_argument("--options", type=int, default=10000)
+    parser.add_argument("--depth", type=int, default=20)
+    args=parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        bench_many(directory, args.logs, args.options)
+        bench_stream(directory, args.depth, args.options)
+        bench_dependencies(directory, args.logs, args.depth, args.options)
+        bench_background(directory, args.logs, args.options)
+
+if __name__ == "__main__":
+    main()
@@ -3,48 +3,253 @@ import configparser
 import os
 import __main__
 import datetime
-import hashlib
 import warnings
 from pathlib import Path
 import json
-import json
+import concurrent.futures
+import asyncio
+import copy
+from array import array
 from inlog.Tree import TreeNode
+from inlog import hashing
+from inlog import logfiles
+from inlog.provenance import ProvenanceStore
+from inlog import views
+from inlog import schema as schema_module
+try:
+    import numpy as np
+    _has_numpy=True
+except ImportError:
+    _has_numpy=False
+
+def _parse_numpy_int(val, dtype, sep):
+    """Parse a string of integers with `np.fromstring`.
+
+    fromstring saturates or wraps integers which are out of range without an error. Therefore, the values are parsed as 64 bit integers and checked against the range of dtype.
+
+    Returns
+    -------
+    numpy.ndarray or None
+        The array or None if a value might be out of range.
+    """
+    wide=np.dtype(np.int64 if dtype.kind=="i" else np.uint64)
+    result=np.fromstring(val, dtype=wide, sep=sep)
+    if result.size==0:
+        return result.astype(dtype)
+    info=np.iinfo(dtype)
+    wide_info=np.iinfo(wide)
+    low, high=result.min(), result.max()
+    #values at the limits of the 64 bit range might be saturated
+    saturated=high>=wide_info.max or (dtype.kind=="i" and low<=wide_info.min)
+    if saturated or low<info.min or high>info.max:
+        return None
+    return result.astype(dtype)
 
 class Logger(object):
     """Parser to read inputfiles and create logs."""
 
-    def __init__(self, config_dict=None, version=None, def_opts=None):
+    def __init__(self, config_dict=None, version=None, def_opts=None, hash_cache=True, hash_workers=1, hash_executor="thread", hash_algorithm="sha256", hash_mode="full", background_hashing=False):
         """
         Create Logger for config parsing and logging.
 
         Parameters
         ----------
-        config_dict : dict
-            Dictionary with the input parameters.
+        config_dict : dict or TreeNode
+            Dictionary with the input parameters. A TreeNode is shared with the Logger, see `def_opts`.
         version : str
             Version of the program.
 
         Keyword Arguments
         -----------------
-        def_opts : dict, optional
-            Dictionary with default input parameters. (default: None)
+        def_opts : dict or TreeNode, optional
+            Dictionary with default input parameters. A TreeNode is shared instead of copied: it is marked as shared (see `TreeNode.share()`) and nodes are copied only when the Logger modifies them. Use this to create many Loggers from the same large defaults. (default: None)
+        hash_cache : bool or inlog.hashing.HashCache, optional
+            Cache for the hashes of output files. If True, the default persistent cache is used (see `inlog.hashing.default_cache()`). If False or None, files are hashed every time. (default: True)
+        hash_workers : int, optional
+            Number of output files hashed concurrently when writing a log. If None, the default of the executor is used. (default: 1)
+        hash_executor : str, optional
+            Can be 'thread' or 'process'. (default: 'thread')
+        hash_algorithm : str, optional
+            Algorithm used to hash output files, see `inlog.hashing.ALGORITHMS`. (default: 'sha256')
+        hash_mode : str, optional
+            Can be 'full' or 'fingerprint'. A fingerprint hashes only the size and some chunks of each output file, which is much faster for huge files. Use `inlog.verify_log(..., upgrade=True)` to replace fingerprints by full hashes later. (default: 'full')
+        background_hashing : bool, optional
+            If True, output files are hashed in a background thread as soon as they are added. Files which are modified afterwards are hashed again when the log is written. (default: False)
         """
         self.filename=None
+        self.loader=None #parser used for the config file, set by the load functions
         self.version=version
         self.creation_date=datetime.datetime.now()
         self.outfilenames=[]
+        if hash_cache is True:
+            hash_cache=hashing.default_cache()
+        self.hash_cache=hash_cache or None
+        self.hash_workers=hash_workers
+        self.hash_executor=hash_executor
+        self.hash_algorithm=hash_algorithm
+        self.hash_mode=hash_mode
+        self.background_hashing=background_hashing
+        self._hash_pool=None
+        self._hash_futures={} #path -> (file state, algorithm, fingerprint, future) of background hashing
+        self._write_pool=None
+        self._write_futures=[] #pending or failed background writes
+        self._header=None #fixed log header of snapshots, see _snapshot()
 
         if config_dict is None:
             config_dict={} 
         if def_opts is None:
             def_opts={}
-        self.options=TreeNode.from_leafdict(def_opts)
-        config_tree=TreeNode.from_leafdict(config_dict)
-        self.options.update(config_tree)
-        self.accessed=self.options.copy()
-        self.accessed.set_all(False)
-    
-    
+        def_tree=def_opts.share() if isinstance(def_opts, TreeNode) else TreeNode.from_leafdict(def_opts)
+        config_tree=config_dict.share() if isinstance(config_dict, TreeNode) else TreeNode.from_leafdict(config_dict)
+        self.options=def_tree.merged(config_tree)
+        self._build_index()
+
+    def _build_index(self, accessed_paths=None):
+        """Index all nodes of the options tree by their key path.
+
+        Nodes get consecutive ids in depth-first order. `_index` maps the key path to the id and `_nodes` maps the id to the node.
+        The access state of all nodes is stored in the bytearray `_accessed`, indexed by id.
+        The index needs to be rebuilt whenever the structure of the options tree changes. Changing values only does not require a rebuild.
+
+        Parameters
+        ----------
+        accessed_paths : set, optional
+            Key paths of the nodes which are marked as accessed in the new index. (default: None)
+        """
+        self._match_index=None
+        self._structure=None
+        index={}
+        nodes=[]
+        stack=[((), self.options)]
+        while stack:
+            keys, node=stack.pop()
+            index[keys]=len(nodes)
+            nodes.append(node)
+            if node.children:
+                stack.extend([(keys+(k,), v) for k, v in reversed(node.children.items())])
+        self._index=index
+        self._nodes=nodes
+        self._accessed=bytearray(len(nodes))
+        if accessed_paths:
+            for keys in accessed_paths:
+                if keys in index:
+                    self._accessed[index[keys]]=1
+
+    def _get_structure(self):
+        """Get the parent id and the end of the subtree of each node, indexed by id.
+
+        Since descendants of a node have consecutive ids, the descendants of node i are the nodes i+1 to ends[i]-1.
+        The arrays are built lazily and reset together with the path index.
+
+        Returns
+        -------
+        tuple
+            (parents, ends), arrays of node ids
+        """
+        if self._structure is None:
+            paths=list(self._index) #insertion order is the id
+            parents=array("q", [-1])
+            parents.extend(self._index[keys[:-1]] for keys in paths[1:])
+            ends=array("q", range(1, len(paths)+1))
+            for node_id in range(len(paths)-1, 0, -1): #children have larger ids than their parents
+                parent=parents[node_id]
+                if ends[node_id]>ends[parent]:
+                    ends[parent]=ends[node_id]
+            self._structure=(parents, ends)
+        return self._structure
+
+    def _accessed_paths(self):
+        """Get the key paths of all accessed nodes."""
+        return {keys for keys, flag in zip(self._index, self._accessed) if flag}
+
+    def _mark_accessed(self, node_id, include_self=True):
+        """Mark a node and all its descendants as accessed."""
+        if not self._nodes[node_id].children:
+            if include_self:
+                self._accessed[node_id]=1
+            return
+        start=node_id if include_self else node_id+1
+        end=self._get_structure()[1][node_id]
+        self._accessed[start:end]=b"\x01"*(end-start)
+
+    def _lookup(self, keys):
+        """Get the id of the node with the given key path. Raises a KeyError with the first missing key, like `TreeNode.get`."""
+        try:
+            return self._index[keys]
+        except KeyError:
+            for i in range(1, len(keys)+1):
+                if keys[:i] not in self._index:
+                    raise KeyError(keys[i-1]) from None
+            raise
+
+    def _match(self, keys):
+        """Get the key path of the first depth-first match of keys, see `TreeNode.match_depth_first`.
+
+        Results are stored in `_match_index`, which is built lazily and reset together with the path index.
+        The first match of a single key is its first occurrence in depth-first order, so all single keys are indexed in one pass.
+
+        Returns
+        -------
+        tuple or None
+            The key path or None if there is no match.
+        """
+        if self._match_index is None:
+            self._match_index={}
+            for path in self._index: #insertion order is depth-first
+                if path and (path[-1],) not in self._match_index:
+                    self._match_index[(path[-1],)]=path
+        try:
+            return self._match_index[keys]
+        except KeyError:
+            if len(keys)==1: #all matches of single keys are indexed already
+                return None
+            path=self.options.match_depth_first_path(*keys)
+            self._match_index[keys]=path
+            return path
+
+    def _own(self, keys):
+        """Get the node with the given key path for modification.
+
+        If the node is shared (see `TreeNode.share()`), it is replaced by a copy in the options tree, together with all its shared ancestors.
+        Since the descendants of shared nodes are shared as well, the copying stops at the first ancestor which is not shared.
+        The structure of the tree does not change, so the path index stays valid.
+
+        Returns
+        -------
+        TreeNode
+            The node, which can be modified in place.
+        """
+        node_id=self._lookup(keys)
+        node=self._nodes[node_id]
+        if not node.shared:
+            return node
+        own=child=self._nodes[node_id]=node.shallow_copy()
+        for i in range(len(keys)-1, -1, -1):
+            parent_id=self._index[keys[:i]]
+            parent=self._nodes[parent_id]
+            if parent.shared:
+                parent=self._nodes[parent_id]=parent.shallow_copy()
+                parent.children[keys[i]]=child
+                child=parent
+            else:
+                parent.children[keys[i]]=child
+                break
+        else:
+            self.options=child
+        return own
+
+    def _own_subtree(self, keys):
+        """Like `_own`, but all descendants of the node can be modified in place as well."""
+        node=self._own(keys)
+        stack=[(keys, node)]
+        while stack:
+            path, node=stack.pop()
+            for k, v in node.children.items():
+                if v.shared:
+                    v=node.children[k]=self._nodes[self._index[path+(k,)]]=v.shallow_copy()
+                stack.append((path+(k,), v))
+        return self._nodes[self._index[keys]]
+
     def _get(self, *keys):
         """Get the value of an option without setting it to accessed.
 
@@ -53,7 +258,10 @@ class Logger(object):
         value
             The value of the option
         """
-        return self.options.get(*keys).to_leafdict()
+        node=self._nodes[self._lookup(keys)]
+        if not node.children:
+            return node.value
+        return node.to_leafdict()
     
     def get(self, *keys):
         """Get the value of an input parameter. Mark this parameter as accessed.
@@ -67,9 +275,109 @@ class Logger(object):
         value
             The value for the given keys.
         """
-        return_value=self._get(*keys)
-        self.set_accessed(*keys)
-        return return_value
+        node_id=self._lookup(keys)
+        node=self._nodes[node_id]
+        self._mark_accessed(node_id)
+        if not node.children:
+            return node.value
+        return node.to_leafdict()
+
+    def get_many(self, *paths):
+        """Get the values of multiple input parameters at once. Mark these parameters as accessed.
+
+        Parameters
+        ----------
+            *paths: The key paths to the parameters, as tuples of keys. A single key can be given without tuple.
+                Alternatively, a single dictionary {name: key path} can be given.
+
+        Returns
+        -------
+        tuple or dict
+            The values in the order of the paths. If a dictionary of paths is given, a dictionary with the same names is returned.
+
+        Examples
+        --------
+        >>> start, stop=config.get_many(("section1", "start"), ("section1", "stop"))
+        """
+        if len(paths)==1 and isinstance(paths[0], dict):
+            return dict(zip(paths[0], self.get_many(*paths[0].values())))
+        index=self._index
+        nodes=self._nodes
+        accessed=self._accessed
+        values=[]
+        for keys in paths:
+            if not isinstance(keys, tuple):
+                keys=(keys,)
+            node_id=index[keys] if keys in index else self._lookup(keys)
+            node=nodes[node_id]
+            if node.children:
+                self._mark_accessed(node_id)
+                values.append(node.to_leafdict())
+            else:
+                accessed[node_id]=1
+                values.append(node.value)
+        return tuple(values)
+
+    def view(self, *keys):
+        """Get a read-only view of an input parameter subtree.
+
+        In contrast to `get()`, the subtree is not copied into a new dictionary and only the options which are actually read through the view are marked as accessed.
+        The view reflects later changes of the options.
+
+        Parameters
+        ----------
+            *keys: The keys to the subtree. If no keys are given, a view of all parameters is returned.
+
+        Returns
+        -------
+        OptionsView or value
+            A Mapping with the options of the subtree. If the keys point to a single option, its value is returned and marked as accessed.
+        """
+        node_id=self._lookup(keys)
+        node=self._nodes[node_id]
+        if not node.children:
+            self._accessed[node_id]=1
+            return node.value
+        return views.OptionsView(self, keys)
+
+    def freeze(self, *keys):
+        """Get an immutable snapshot of an input parameter subtree, for fast access in hot loops.
+
+        Options read from the snapshot are marked as accessed in this Logger. Later changes of the options are not reflected in the snapshot.
+
+        Parameters
+        ----------
+            *keys: The keys to the subtree. If no keys are given, a snapshot of all parameters is returned.
+
+        Returns
+        -------
+        FrozenOptions or value
+            The hashable and picklable snapshot, see `inlog.views.FrozenOptions`. If the keys point to a single option, its value is returned and marked as accessed.
+
+        Examples
+        --------
+        >>> params=config.freeze("section1")
+        >>> for i in range(params.start, params.stop):
+        ...     pass
+        """
+        node_id=self._lookup(keys)
+        node=self._nodes[node_id]
+        if not node.children:
+            self._accessed[node_id]=1
+            return node.value
+        return views._freeze(node, keys, views._AccessRecorder(self))
+
+    def record_access(self, frozen):
+        """Mark all options as accessed which have been read from a snapshot, e.g. a snapshot which was pickled to a worker process and back.
+
+        Parameters
+        ----------
+        frozen : FrozenOptions
+            The snapshot, see `freeze()`. Options which do not exist anymore are ignored.
+        """
+        for keys in frozen._recorder.paths:
+            if keys in self._index:
+                self._accessed[self._index[keys]]=1
 
     def set(self, value, *keys):
         """Set the value of a parameter.
@@ -78,28 +386,36 @@ class Logger(object):
             value: The value to be set.
             *keys: The keys to the parameter.
         """
-        self.options.get(*keys).value=value
-        self.options.make_leaf(*keys)
+        node=self._own(keys)
+        node.value=value
+        if node.children:
+            node_id=self._index[keys]
+            if 1 in self._accessed[node_id:self._get_structure()[1][node_id]]:
+                self._accessed[node_id]=1 #keep the new leaf in the accessed options, like its accessed descendants
+            accessed_paths=self._accessed_paths()
+            node.children={}
+            self._build_index(accessed_paths)
     
     def set_subtree(self, config_dict, *keys):
         """Set multiple options at once by providing a (nested) dictionary.
 
         Parameters
         ----------
-        config_dict : dict
-            The dictionary with the new options. Can be nested.
+        config_dict : dict or TreeNode
+            The dictionary with the new options. Can be nested. A TreeNode is shared instead of copied, see `Logger()`.
         *keys : tuple
             The keys to the subtree where the new options will be inserted.
         """
-        subtree=TreeNode.from_leafdict(config_dict)
-        self.options.get(*keys).children=subtree.children
-        subtree_accessed=subtree.copy()
-        subtree_accessed.set_all(True)
-        self.accessed.get(*keys).children=subtree_accessed.children
+        subtree=config_dict.share() if isinstance(config_dict, TreeNode) else TreeNode.from_leafdict(config_dict)
+        node=self._own(keys)
+        accessed_paths=self._accessed_paths()
+        node.children=dict(subtree.children)
+        self._build_index(accessed_paths)
+        self._mark_accessed(self._index[keys], include_self=False) #new options are considered as accessed
     
     def _reset_access(self):
         """Reset the accessed status of all parameters."""
-        self.accessed.set_all(False)
+        self._accessed=bytearray(len(self._nodes))
     
     # def _get_accessed(self, *keys):
     #     """Get the accessed subtree of a parameter."""
@@ -111,22 +427,149 @@ class Logger(object):
     #     print(self._get_accessed(*keys[:-1])[keys[-1]])
     #     return self._get_accessed(*keys[:-1])[keys[-1]]
     
+    @property
+    def accessed(self):
+        """Tree with the same structure as the options, with the access state of each option as value.
+
+        Deprecated: the access state is stored in a flat array now. The tree is built on every call and is a read-only copy, changing it has no effect. Use `is_accessed()` and `get_accessed_options()` instead.
+        """
+        warnings.warn("Logger.accessed is deprecated and returns a copy of the access state. Use is_accessed() and get_accessed_options() instead.", DeprecationWarning, stacklevel=2)
+        parents=self._get_structure()[0]
+        nodes=[TreeNode(bool(self._accessed[0]))]
+        for node_id, keys in enumerate(self._index):
+            if node_id==0:
+                continue
+            node=TreeNode(bool(self._accessed[node_id]))
+            nodes[parents[node_id]].children[keys[-1]]=node
+            nodes.append(node)
+        return nodes[0]
+
     def is_accessed(self, *keys):
         """Get the accessed status of a parameter."""
-        return self.accessed.get(*keys).value
+        return bool(self._accessed[self._lookup(keys)])
     
     def set_accessed(self, *keys):
         """Mark a parameter as accessed."""
-        self.accessed.set_all(True, *keys)
+        self._mark_accessed(self._lookup(keys))
+
+    def _accessed_selection(self, start):
+        """Get the nodes of a subtree which are part of the accessed options, see `get_accessed_options()`.
+
+        Returns
+        -------
+        tuple or None
+            (keep, has_children), bytearrays indexed by node id minus start. keep marks accessed nodes and their ancestors, has_children marks nodes with kept descendants. None if no node is accessed.
+        """
+        parents, ends=self._get_structure()
+        end=ends[start]
+        if 1 not in self._accessed[start:end]:
+            return None
+        #propagate the access state to the ancestors, in reverse depth-first order
+        keep=bytearray(self._accessed[start:end])
+        has_children=bytearray(end-start)
+        for node_id in range(end-1, start, -1):
+            if keep[node_id-start]:
+                parent=parents[node_id]-start
+                keep[parent]=1
+                has_children[parent]=1
+        return keep, has_children
+
+    def _iter_options_json(self, accessed_only=False, pad=""):
+        """Generate the lines of the options in json format, without creating a dictionary of the options first.
+
+        The lines are the same as the lines of `json.dumps(options, indent=4)`, with `options` from `get_accessed_options()` or `options.to_leafdict()`.
+
+        Parameters
+        ----------
+        accessed_only : bool, optional
+            If True, only include accessed options. (default: False)
+        pad : str, optional
+            Indentation of all lines except the first one, to embed the options in a larger json document. (default: "")
+
+        Yields
+        ------
+        str
+            The lines, without line breaks.
+        """
+        nodes=self._nodes
+        ends=self._get_structure()[1]
+        keep=None
+        if accessed_only:
+            selection=self._accessed_selection(0)
+            if selection is None:
+                yield "null"
+                return
+            keep=selection[0]
+        def children(node_id):
+            """Keys and ids of the children which are included in the log."""
+            result=[]
+            child_id=node_id+1
+            for k in nodes[node_id].children:
+                if keep is None or keep[child_id]:
+                    result.append((k, child_id))
+                child_id=ends[child_id]
+            return result
+        root=children(0)
+        if not root:
+            lines=logfiles.json_value(nodes[0].value).split("\n")
+            yield lines[0]
+            for line in lines[1:]:
+                yield pad+line
+            return
+        yield "{"
+        stack=[[root, 0, pad+"    ", pad]] #items, position of the next item, indentation of the items and of the closing bracket
+        while stack:
+            frame=stack[-1]
+            items, pos, item_pad, close_pad=frame
+            if pos==len(items):
+                stack.pop()
+                comma="," if stack and stack[-1][1]<len(stack[-1][0]) else ""
+                yield close_pad+"}"+comma
+                continue
+            frame[1]=pos+1
+            k, node_id=items[pos]
+            key=item_pad+logfiles.json_key(k)+": "
+            comma="," if pos+1<len(items) else ""
+            subitems=children(node_id)
+            if subitems:
+                yield key+"{"
+                stack.append([subitems, 0, item_pad+"    ", item_pad])
+                continue
+            lines=logfiles.json_value(nodes[node_id].value).split("\n")
+            if len(lines)==1:
+                yield key+lines[0]+comma
+            else:
+                yield key+lines[0]
+                for line in lines[1:-1]:
+                    yield item_pad+line
+                yield item_pad+lines[-1]+comma
 
     def get_accessed_options(self, *keys):
-        """Get only the accessed parameters of a given subtree."""
-        accessed_state=self.accessed.get(*keys).filter_any()
-        if accessed_state is None:
+        """Get only the accessed parameters of a given subtree.
+
+        The result contains all accessed nodes and their ancestors. Accessed nodes without accessed descendants are included with their value.
+        """
+        start=self._lookup(keys)
+        selection=self._accessed_selection(start)
+        if selection is None:
             return None
-        accessed_options=self.options.get(*keys)
-        accessed_options=accessed_options.select(accessed_state)
-        return accessed_options.to_leafdict()
+        keep, has_children=selection
+        parents, ends=self._get_structure()
+        end=ends[start]
+        paths=list(self._index)
+        if not has_children[0]:
+            return self._nodes[start].value
+        result={}
+        containers={start: result}
+        for node_id in range(start+1, end):
+            if not keep[node_id-start]:
+                continue
+            if has_children[node_id-start]:
+                value=containers[node_id]={}
+            else:
+                value=self._nodes[node_id].value
+            containers[parents[node_id]][paths[node_id][-1]]=value
+        return result
 
     
     # def _find_depth_first(self, key, path=None):
@@ -159,11 +602,10 @@ class Logger(object):
         """
         if not isinstance(keys, tuple):
             keys=(keys,)
-        result=self.options.match_depth_first(*keys)
-        if result is None:
+        path=self._match(keys)
+        if path is None:
             raise KeyError(f"No matches for {keys} found.")
-        self.accessed.match_depth_first(*keys).set_all(True)
-        return result.to_leafdict()
+        return self.get(*path)
 
     def __setitem__(self, keys, value):
         """Set the first matching parameter or subtree in the config dictionary.
@@ -177,10 +619,10 @@ class Logger(object):
         """
         if not isinstance(keys, tuple):
             keys=(keys,)
-        result=self.options.match_depth_first(*keys)
-        if result is None:
+        path=self._match(keys)
+        if path is None:
             raise KeyError(f"No matches for {keys} found.")
-        result.value=value
+        self._own(path).value=value
 
     def convert_type(self, dtype, *keys):
         """
@@ -202,9 +644,9 @@ class Logger(object):
         else:
             conversion_func=dtype
         conversion_func_none=lambda val: conversion_func(val) if val is not None else None #non-leaf nodes always have value None
-        self.options.get(*keys).map(conversion_func_none)
+        self._own_subtree(keys).map(conversion_func_none)
 
-    def convert_array(self, dtype, *keys, sep=",", removeSpaces=False):
+    def convert_array(self, dtype, *keys, sep=",", removeSpaces=False, as_numpy=False):
         """
         Convert one or multiple config options from string to an array of the given type.
 
@@ -221,22 +663,98 @@ class Logger(object):
             The separator between the array values (default: ',')
         removeSpaces : bool, optional
             Remove spaces in the elements when converting to string array. (default: False)
+        as_numpy : bool, optional
+            Return numpy arrays instead of lists. Numeric types (e.g. int, float or numpy dtypes) are converted by numpy, which is much faster for long arrays. If numpy is not installed, lists are returned.
+            Integers which do not fit into the dtype raise an OverflowError. (default: False)
         """
+        numpy_dtype=None
+        if as_numpy and _has_numpy:
+            try:
+                numpy_dtype=np.dtype(dtype)
+            except TypeError:
+                pass
+            if numpy_dtype is not None and numpy_dtype.kind not in "iufc": #e.g. bool("false") differs from numpy
+                numpy_dtype=None
         def convert_array_none(val):
             if val is None:
                 return None
             elif isinstance(val, str):
+                if numpy_dtype is not None:
+                    #parse in C. Strings which numpy cannot parse completely are converted element-wise, to get the same errors as without numpy
+                    with warnings.catch_warnings():
+                        warnings.simplefilter("error", DeprecationWarning)
+                        try:
+                            if numpy_dtype.kind in "iu":
+                                result=_parse_numpy_int(val, numpy_dtype, sep)
+                                if result is not None:
+                                    return result
+                            else:
+                                return np.fromstring(val, dtype=numpy_dtype, sep=sep)
+                        except (ValueError, DeprecationWarning):
+                            pass
                 array=val.split(sep)
                 if removeSpaces:
                     array=[x.strip() for x in array]
                 array=[a for a in array if a]
+                if numpy_dtype is not None:
+                    return np.array(array, dtype=numpy_dtype)
                 array=[dtype(a) for a in array]
+                if as_numpy and _has_numpy:
+                    return np.array(array)
                 return array
             else:
                 raise ValueError(f"Option {val} is not a string. Cannot convert to array.")
-        self.options.get(*keys).map(convert_array_none)
+        self._own_subtree(keys).map(convert_array_none)
     
 
+    def apply_schema(self, schema):
+        """Convert, validate and complete the options according to a schema.
+
+        In contrast to multiple calls of `convert_type()` and `convert_array()`, only the options in the schema are visited, each exactly once.
+        Missing options with defaults are added, but not marked as accessed.
+
+        Parameters
+        ----------
+        schema : Schema or dict or dataclass
+            The schema, see `inlog.schema.Schema`. Create the Schema once and reuse it for multiple Loggers, to avoid compiling it every time.
+
+        Raises
+        ------
+        ValueError
+            If a required option is missing or an option cannot be converted or is invalid.
+        """
+        if not isinstance(schema, schema_module.Schema):
+            schema=schema_module.Schema(schema)
+        missing={}
+        for keys, convert, make_default in schema.compiled:
+            node_id=self._index.get(keys)
+            if node_id is None:
+                if make_default is None:
+                    raise ValueError(f"Missing option {keys}.")
+                missing[keys]=make_default()
+                continue
+            node=self._nodes[node_id]
+            try:
+                if node.children:
+                    self._own_subtree(keys).map(lambda val: convert(val) if val is not None else None) #non-leaf nodes always have value None
+                elif node.value is not None:
+                    self._own(keys).value=convert(node.value)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"Invalid option {keys}: {e}") from e
+        if missing:
+            accessed_paths=self._accessed_paths()
+            for keys, default in missing.items():
+                i=len(keys)-1
+                while keys[:i] not in self._index:
+                    i-=1
+                node=self._own(keys[:i])
+                if i>0 and not node.children and node.value is not None:
+                    raise ValueError(f"Cannot add default for {keys}, since {keys[:i]} is an option.")
+                for k in keys[i:]:
+                    node=node.children.setdefault(k, TreeNode())
+                node.value=default
+            self._build_index(accessed_paths)
+
     def add_outfile(self, output_files):
         """
             Add the given filename(s) to the list of outputfiles of your program. They will be listed in the logfile, together with their hash value.
@@ -252,6 +770,8 @@ class Logger(object):
         for path in output_files:
             if not path.exists():
                 warnings.warn(f"At the moment, there is no such file: {path}")
+            elif self.background_hashing:
+                self._submit_hash(path)
             self.outfilenames.append(path)
 
     def set_outfile(self, output_files):
@@ -264,30 +784,98 @@ class Logger(object):
             The paths of the outputfiles. Relative paths will be interpreted relative to the current working directory.
         """
         self.outfilenames=[]
+        self._hash_futures={}
         self.add_outfile(output_files)
 
-    def hash_file(self, file):
+    def _submit_hash(self, path):
+        """Start hashing a file in the background."""
+        if self._hash_pool is None:
+            self._hash_pool=concurrent.futures.ThreadPoolExecutor(self.hash_workers, thread_name_prefix="inlog-hash")
+        state=hashing.file_state(os.stat(path))
+        fingerprint=self._get_fingerprint()
+        future=self._hash_pool.submit(hashing.hash_files, [path], self.hash_algorithm, self.hash_cache, fingerprint=fingerprint)
+        self._hash_futures[path]=(state, self.hash_algorithm, fingerprint, future)
+
+    def _get_fingerprint(self):
+        """Get the fingerprint parameters (chunks, chunk_size) for the current hash mode, or None for full hashes."""
+        if self.hash_mode=="full":
+            return None
+        elif self.hash_mode=="fingerprint":
+            return (hashing.FINGERPRINT_CHUNKS, hashing.FINGERPRINT_CHUNK_SIZE)
+        raise ValueError(f"Unknown hash mode: {self.hash_mode}")
+
+    def _collect_hash(self, path, algorithm, fingerprint=None):
+        """Get the result of background hashing, if it is still valid.
+
+        Returns
+        -------
+        str or None
+            The hash or None if the file was not hashed in the background, has been modified since or hashing failed.
+        """
+        if path not in self._hash_futures:
+            return None
+        state, future_algorithm, future_fingerprint, future=self._hash_futures[path]
+        if future_algorithm!=algorithm or future_fingerprint!=fingerprint:
+            return None
+        try:
+            if hashing.file_state(os.stat(path))!=state:
+                return None
+            return future.result()[0]
+        except OSError:
+            return None
+
+    def hash_file(self, file, algorithm=None):
         """
         Calculate the hash of a file.
 
+        If the Logger has a hash cache, unchanged files are not read again.
+
         Parameters
         ----------
         file : str or Path
             The path of the file
+        algorithm : str, optional
+            The hash algorithm. If None, the algorithm of the Logger is used. (default: None)
 
         Returns
         -------
         str
-            The hexadecimal sha256 hash of the file.
+            The hexadecimal hash of the file.
+        """
+        if algorithm is None:
+            algorithm=self.hash_algorithm
+        if self.hash_cache is not None:
+            return self.hash_cache.hash_file(file, algorithm)
+        return hashing.hash_file(file, algorithm)
+
+    def _hash_outfiles(self, algorithm=None):
+        """Hash all output files concurrently.
+
+        Parameters
+        ----------
+        algorithm : str, optional
+            The hash algorithm. If None, the algorithm of the Logger is used. (default: None)
+
+        Returns
+        -------
+        list
+            List of dictionaries with the keys "path", "hash", "algorithm" and, for fingerprints, "fingerprint". In the order the output files were added.
         """
-        BLOCK_SIZE = 65536 # The size of each read from the file
-        file_hash = hashlib.sha256() # Create the hash object, can use something other than `.sha256()` if you wish
-        with open(file, 'rb') as f: # Open the file to read it's bytes
-            fb = f.read(BLOCK_SIZE) # Read from the file. Take in the amount declared above
-            while len(fb) > 0: # While there is still data being read from the file
-                file_hash.update(fb) # Update the hash
-                fb = f.read(BLOCK_SIZE) # Read the next block from the file
-        return file_hash.hexdigest() # Get the hexadecimal digest of the hash
+        if algorithm is None:
+            algorithm=self.hash_algorithm
+        fingerprint=self._get_fingerprint()
+        hashes=[self._collect_hash(path, algorithm, fingerprint) for path in self.outfilenames]
+        missing=[i for i, h in enumerate(hashes) if h is None]
+        results=hashing.hash_files([self.outfilenames[i] for i in missing], algorithm, cache=self.hash_cache, max_workers=self.hash_workers, executor=self.hash_executor, fingerprint=fingerprint)
+        for i, file_hash in zip(missing, results):
+            hashes[i]=file_hash
+        entries=[]
+        for path, file_hash in zip(self.outfilenames, hashes):
+            entry={"path": str(path), "hash": file_hash, "algorithm": algorithm}
+            if fingerprint is not None:
+                entry["fingerprint"]={"chunks": fingerprint[0], "chunk_size": fingerprint[1]}
+            entries.append(entry)
+        return entries
 
     def _get_program_file(self):
         try: #If the program is run from a script
@@ -297,31 +885,30 @@ class Logger(object):
             #see: https://stackoverflow.com/a/35514032
             return None
     
-    def _to_string(self, accessed_only=False):
+    def _to_string(self, accessed_only=False, hash_algorithm=None):
+        header=self._create_log_header()
         lines=[]
-        lines.append("<Date> "+str(datetime.datetime.now()))
-        lines.append("<Program> "+str(self._get_program_file()))
-        lines.append("<Arguments> "+str(sys.argv[1:]))
-        lines.append("<Version> "+str(self.version))
-        lines.append("<Input> "+str(self.filename))
-        lines.append("<Runtime> "+str(datetime.datetime.now()-self.creation_date))
+        lines.append("<Date> "+header["date"])
+        lines.append("<Program> "+str(header["program"]))
+        lines.append("<Arguments> "+str(header["arguments"]))
+        lines.append("<Version> "+str(header["version"]))
+        lines.append("<Input> "+header["input"])
+        lines.append("<Runtime> "+header["runtime"])
         lines.append("**************************")
-        if accessed_only:
-            log_options_dict=self.get_accessed_options()
-        else:
-            log_options_dict=self.options.to_leafdict()
-        log_options_str=json.dumps(log_options_dict, indent=4, default=str)       
-        lines+=[line for line in log_options_str.split("\n")]
+        lines.extend(self._iter_options_json(accessed_only))
         if len(self.outfilenames)>0:
             lines.append("**************************")
             lines.append("Output files created:")
-            for path in self.outfilenames:
-                lines.append("<PATH> "+str(path))
-                lines.append("<HASH> "+self.hash_file(path))
+            for entry in self._hash_outfiles(hash_algorithm):
+                lines.append("<PATH> "+entry["path"])
+                lines.append("<HASH> "+entry["hash"])
+                lines.append("<ALGORITHM> "+entry["algorithm"])
+                if "fingerprint" in entry:
+                    lines.append("<FINGERPRINT> {chunks} chunks of {chunk_size} bytes".format(**entry["fingerprint"]))
         lines=[l+"\n" for l in lines]
         return lines
 
-    def _create_log_txt(self, accessed_only=False):
+    def _create_log_txt(self, accessed_only=False, hash_algorithm=None):
         """
         Create a log in text format
 
@@ -329,6 +916,8 @@ class Logger(object):
         ----------
         accessed_only : bool, optional
             If True, only include options that were accessed, by default False
+        hash_algorithm : str, optional
+            Algorithm to hash the output files. If None, the algorithm of the Logger is used.
 
         Returns
         -------
@@ -338,13 +927,13 @@ class Logger(object):
         log=[]
         log.append("cd "+os.getcwd())
         log.append("python3 "+" ".join(sys.argv))
-        lines=self._to_string(accessed_only=accessed_only)
+        lines=self._to_string(accessed_only=accessed_only, hash_algorithm=hash_algorithm)
         lines=['#'+line for line in lines]
         log.extend(lines)
         return log
     
 
-    def _create_log_dict(self, accessed_only=False):
+    def _create_log_dict(self, accessed_only=False, hash_algorithm=None):
         """Create a log dictionary.
 
         Example:
@@ -364,7 +953,8 @@ class Logger(object):
             "output_files": [
                 {
                     "path": "output.txt",
-                    "hash": "1234567890abcdef"
+                    "hash": "1234567890abcdef",
+                    "algorithm": "sha256"
                 }
             ]
         }
@@ -372,9 +962,23 @@ class Logger(object):
         ----------
         accessed_only : bool, optional
             If True, only include parameters that were accessed, by default False
+        hash_algorithm : str, optional
+            Algorithm to hash the output files. If None, the algorithm of the Logger is used.
         Returns:
             dict -- dictionary with the log information.
         """
+        log=self._create_log_header()
+        if accessed_only:
+            log["options"]=self.get_accessed_options()
+        else:
+            log["options"]=self.options.to_leafdict()
+        log["output_files"]=self._hash_outfiles(hash_algorithm)
+        return log
+
+    def _create_log_header(self):
+        """Create the entries of a json log before the options."""
+        if self._header is not None: #snapshot for a background write
+            return dict(self._header)
         log={}
         log["date"]=str(datetime.datetime.now())
         log["program"]=self._get_program_file()
@@ -382,13 +986,37 @@ class Logger(object):
         log["version"]=self.version
         log["input"]=str(self.filename)
         log["runtime"]=str(datetime.datetime.now()-self.creation_date)
-        if accessed_only:
-            log["options"]=self.get_accessed_options()
-        else:
-            log["options"]=self.options.to_leafdict()
-        log["output_files"]=[{"path": str(path), "hash": self.hash_file(path)} for path in self.outfilenames]
         return log
 
+    def _iter_log_json(self, old_logs, accessed_only=False, hash_algorithm=None):
+        """Generate the lines of a json log, like `json.dumps(log, indent=4)` of the log in `_write_log_json()`.
+
+        The options are serialized directly from the tree and old logs are encoded one at a time, see `logfiles.iter_dependency_json()`, so the complete log is never held in memory.
+        """
+        yield "{"
+        for k, v in self._create_log_header().items():
+            yield "    "+logfiles.json_key(k)+": "+logfiles.json_value(v).replace("\n", "\n    ")+","
+        lines=self._iter_options_json(accessed_only, pad="    ")
+        previous='    "options": '+next(lines)
+        for line in lines:
+            yield previous
+            previous=line
+        yield previous+","
+        yield '    "output_files": '+logfiles.json_value(self._hash_outfiles(hash_algorithm)).replace("\n", "\n    ")+","
+        if len(old_logs)==0:
+            yield '    "dependencies": {}'
+        else:
+            yield '    "dependencies": {'
+            for i, old in enumerate(old_logs):
+                lines=logfiles.iter_dependency_json(old, pad="        ")
+                previous="        "+logfiles.json_key(str(old.resolve()))+": "+next(lines)
+                for line in lines:
+                    yield previous
+                    previous=line
+                yield previous+("," if i+1<len(old_logs) else "")
+            yield "    }"
+        yield "}"
+
     def show_data(self):
         """Print log."""
         print(*self._to_string(accessed_only=False))
@@ -402,36 +1030,44 @@ class Logger(object):
 
 
 
-    def _write_log_txt(self, new_logs, old_logs, accessed_only=False):
+    def _write_log_txt(self, new_logs, old_logs, accessed_only=False, hash_algorithm=None, link=None):
         old_lines=[]
-        log=self._create_log_txt(accessed_only=accessed_only)
+        log=self._create_log_txt(accessed_only=accessed_only, hash_algorithm=hash_algorithm)
         for old in old_logs:
             with open(old, "r") as oldfile:
                 old_lines.extend(oldfile.readlines())
                 old_lines[-1]=old_lines[-1].strip("\n")+"\n"
                 old_lines.extend(f"# <Logfile> {old}\n") #This has to happen at the old logs! This way, even manually created logfiles get the path appended.
                 old_lines.extend("#=========================================\n")
-        for new in new_logs:
-            with open(new, "w") as newfile:
-                newfile.writelines(old_lines)
-                newfile.writelines(log)
+        logfiles.write_files(("".join(old_lines)+"".join(log)).encode(), new_logs, link)
     
-    def _write_log_json(self, new_logs: list, old_logs: list, accessed_only=False):
+    def _write_log_json(self, new_logs: list, old_logs: list, accessed_only=False, hash_algorithm=None, dependency_mode='embed', link=None, stream=False, cache_dependencies=False):
+        if dependency_mode not in ('embed', 'reference'):
+            raise ValueError(f"Unknown value for 'dependency_mode': {dependency_mode}")
+        if stream:
+            if dependency_mode!='embed':
+                raise ValueError("Streaming logs is only supported with dependency_mode='embed'.")
+            logfiles.write_stream(logfiles.encode_lines(self._iter_log_json(old_logs, accessed_only, hash_algorithm)), new_logs, link)
+            return None
         dependencies={}
+        encoded=[]
         for old in old_logs:
-            try:
-                with open(old, "r") as oldfile:
-                    old_json=json.load(oldfile)
-                    dependencies[str(old.resolve())]=old_json
-            except json.decoder.JSONDecodeError:
-                with open(old, "r") as oldfile:
-                    dependencies[str(old.resolve())]={"text":oldfile.readlines()}
+            name=str(old.resolve())
+            dependencies[name], old_encoded=logfiles.read_dependency(old, cache_dependencies)
+            encoded.append("        "+logfiles.json_key(name)+": "+old_encoded.replace("\n", "\n        "))
         log_json={}
-        log_json.update(self._create_log_dict(accessed_only=accessed_only))
-        log_json["dependencies"]=dependencies
-        for new in new_logs:
-            with open(new, "w") as newfile:
-                json.dump(log_json, newfile, indent=4, default=str)
+        log_json.update(self._create_log_dict(accessed_only=accessed_only, hash_algorithm=hash_algorithm))
+        if dependency_mode=='reference':
+            log_json["dependencies"]=dependencies
+            log_json=logfiles.to_reference_log(log_json)
+            data=json.dumps(log_json, indent=4, default=logfiles.json_default)
+        else:
+            #the dependencies are inserted already encoded, the result is the same as json.dumps of the complete log
+            data=json.dumps(log_json, indent=4, default=logfiles.json_default)[:-2]
+            data+=',\n    "dependencies": '+("{\n"+",\n".join(encoded)+"\n    }" if encoded else "{}")+"\n}"
+            log_json["dependencies"]=dependencies
+        logfiles.write_files(data.encode(), new_logs, link) #encoded once for all new logs
+        return log_json
 
     @classmethod
     def _get_logfile_name(cls, file, file_ext, ext_modification_mode):
@@ -451,7 +1087,7 @@ class Logger(object):
         return file
 
 
-    def write_log(self, new_logs, old_logs=None, file_ext='log', ext_modification_mode='append', format='json', accessed_only=True):
+    def write_log(self, new_logs, old_logs=None, file_ext='log', ext_modification_mode='append', format='json', accessed_only=True, hash_algorithm=None, dependency_mode='embed', provenance=None, link=None, stream=False, background=False, cache_dependencies=False):
         """
         Write log to files.
 
@@ -471,6 +1107,28 @@ class Logger(object):
             Format of the new logfiles. Can be 'json' or 'txt'. (default: 'json')
         accessed_only : bool, optional
             If True, only the options that were accessed are written to the log. (default: True)
+        hash_algorithm : str, optional
+            Algorithm to hash the output files, see `inlog.hashing.ALGORITHMS`. If None, the algorithm of the Logger is used. (default: None)
+        dependency_mode : str, optional
+            How old logs are stored in json logs. With 'embed', each old log is copied completely into the new log. With 'reference', every ancestor is stored only once in the "log_store" of the new log and dependencies refer to it by its content hash. (default: 'embed')
+        provenance : str or Path or inlog.provenance.ProvenanceStore, optional
+            If given, the log is also registered in this provenance database. Only supported for json logs. (default: None)
+        link : str, optional
+            If 'hardlink' or 'symlink', only the first new log is written and all other new logs are links to it. Otherwise, the log is written to every new logfile. (default: None)
+        stream : bool, optional
+            If True, json logs are written incrementally, without holding the complete log in memory. Old logs are read one at a time.
+            Not supported with dependency_mode='reference' or provenance. (default: False)
+        background : bool, optional
+            If True, the log is written in a background thread and this function returns immediately. The options, their access state, the output files and the log header are taken at the time of the call.
+            Output files are hashed and old logs are read in the background, so they should not be modified until the write is complete. Use `flush()` to wait for all pending writes.
+            Logs are written in the order of the calls. With provenance, give the path of the database instead of a ProvenanceStore. (default: False)
+        cache_dependencies : bool, optional
+            If True, old logs are kept in memory after they are read, so later calls with the same old logs do not read them again, see `inlog.logfiles.read_dependency()`. Not used for streamed logs. (default: False)
+
+        Returns
+        -------
+        concurrent.futures.Future or None
+            With background=True, a future which is done when the log is written. Otherwise None.
         """
         new_logs=self._get_logfile_name(new_logs, file_ext, ext_modification_mode)
         old_logs=self._get_logfile_name(old_logs, file_ext, ext_modification_mode)
@@ -482,13 +1140,93 @@ class Logger(object):
                     warnings.warn(f"Logfile {f} does not exist, but {old_format} was found. Will be using this instead. In inlog 2.2.0, the default behaviour changed from replacing file extensions to appending them. To get back the old behaviour, set ext_modification_mode='replace' in write_log().", DeprecationWarning)
                     old_logs[i]=old_format
                     
+        if provenance is not None and format!='json':
+            raise ValueError("Registering logs in a provenance store is only supported for the json format.")
+        if provenance is not None and stream:
+            raise ValueError("Registering logs in a provenance store is not supported for streamed logs.")
+        if background:
+            #fail at the call instead of in the background thread
+            if format not in ('json', 'txt'):
+                raise ValueError(f"Unknown format: {format}")
+            if dependency_mode not in ('embed', 'reference'):
+                raise ValueError(f"Unknown value for 'dependency_mode': {dependency_mode}")
+            if link not in logfiles.LINK_MODES:
+                raise ValueError(f"Unknown link mode: {link}")
+            if isinstance(provenance, ProvenanceStore):
+                raise ValueError("A ProvenanceStore cannot be used from the background thread. Give the path of the database instead.")
+            if self._write_pool is None:
+                self._write_pool=concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="inlog-write") #a single thread keeps the order of the writes
+            #completed writes are forgotten, failed writes are kept until flush() raises their exception
+            self._write_futures=[f for f in self._write_futures if not f.done() or f.exception() is not None]
+            future=self._write_pool.submit(self._snapshot()._write_log, new_logs, old_logs, format, accessed_only, hash_algorithm, dependency_mode, provenance, link, stream, cache_dependencies)
+            self._write_futures.append(future)
+            return future
+        self._write_log(new_logs, old_logs, format, accessed_only, hash_algorithm, dependency_mode, provenance, link, stream, cache_dependencies)
+
+    def _write_log(self, new_logs, old_logs, format, accessed_only, hash_algorithm, dependency_mode, provenance, link, stream, cache_dependencies):
+        """Write the log to the resolved logfiles, see `write_log()`."""
         if format=='json':
-            self._write_log_json(new_logs, old_logs, accessed_only)
+            log_json=self._write_log_json(new_logs, old_logs, accessed_only, hash_algorithm, dependency_mode, link, stream, cache_dependencies)
+            if isinstance(provenance, ProvenanceStore):
+                provenance.register(log_json, new_logs)
+            elif provenance is not None:
+                with ProvenanceStore(provenance) as store:
+                    store.register(log_json, new_logs)
         elif format=='txt':
-            self._write_log_txt(new_logs, old_logs, accessed_only)
+            self._write_log_txt(new_logs, old_logs, accessed_only, hash_algorithm, link)
         else:
             raise ValueError(f"Unknown format: {format}")
 
+    def write_log_async(self, *args, **kwargs):
+        """Write a log in the background thread and return an awaitable asyncio future.
+
+        Takes the same arguments as `write_log()`. Like with `write_log(..., background=True)`, the state of the Logger is taken when this function is called, not when the future is awaited.
+        Must be called from a running event loop.
+
+        Examples
+        --------
+        >>> await config.write_log_async('Results1.txt')
+        """
+        return asyncio.wrap_future(self.write_log(*args, background=True, **kwargs))
+
+    def _snapshot(self):
+        """Copy of the Logger with the current options, access state, output files and log header, for a background write.
+
+        The options tree is shared with the snapshot (see `TreeNode.share()`), so the Logger copies nodes only when it modifies them afterwards.
+        """
+        snapshot=copy.copy(self)
+        self.options.share()
+        snapshot._nodes=list(self._nodes) #modified in place by _own()
+        snapshot._accessed=bytearray(self._accessed)
+        snapshot._match_index=None
+        snapshot.outfilenames=list(self.outfilenames)
+        snapshot._hash_futures=dict(self._hash_futures)
+        snapshot._header=self._create_log_header()
+        return snapshot
+
+    def flush(self):
+        """Wait until all logs written in the background are complete.
+
+        Raises the exception of the first failed write, if any.
+        """
+        futures=self._write_futures
+        self._write_futures=[]
+        errors=[f.exception() for f in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def close(self):
+        """Wait for all pending writes, see `flush()`, and stop the background threads of the Logger."""
+        try:
+            self.flush()
+        finally:
+            for pool in (self._write_pool, self._hash_pool):
+                if pool is not None:
+                    pool.shutdown()
+            self._write_pool=None
+            self._hash_pool=None
+
 
 
 
@@ -1,91 +1,181 @@
 class TreeNode(object):
+    """Node of a tree with named children.
+
+    All algorithms use explicit stacks instead of recursion, so the depth of a tree is not limited by the recursion limit of python.
+
+    Trees can be shared between multiple owners, e.g. the defaults of many Loggers. Shared nodes (see `share()`) must not be modified in place.
+    Instead, modified copies are created with `merged()` or `shallow_copy()`, which reuse all unchanged subtrees.
+    """
+    __slots__=("value", "children", "shared")
+
     def __init__(self, value=None, children=None) -> None:
         self.value=value
         if children is None:
             children={}
         self.children=children
-        
-    
+        self.shared=False
+
+
     @classmethod
     def from_leafdict(cls, leafs: dict, other=None):
-        children={}
-        for k,v in leafs.items():
-            if isinstance(v, dict):
-                children[k]=cls.from_leafdict(v, other)
-            else:
-                children[k]=TreeNode(v)
-        return cls(value=other, children=children)
-    
+        root=cls(value=other)
+        stack=[(root, leafs)]
+        while stack:
+            node, d=stack.pop()
+            children=node.children
+            for k,v in d.items():
+                if isinstance(v, dict):
+                    child=cls(value=other)
+                    stack.append((child, v))
+                else:
+                    child=TreeNode(v)
+                children[k]=child
+        return root
+
     def to_leafdict(self) -> dict:
         if len(self.children)==0:
             return self.value
-        d={}
-        for k,v in self.children.items():
-            d[k]=v.to_leafdict()
-        return d
-    
+        root={}
+        stack=[(self, root)]
+        while stack:
+            node, d=stack.pop()
+            for k,v in node.children.items():
+                if v.children:
+                    sub=d[k]={}
+                    stack.append((v, sub))
+                else:
+                    d[k]=v.value
+        return root
+
     def get(self, *keys):
-        if len(keys)==0:
-            return self
-        return self.get(*keys[:-1]).children[keys[-1]]
-    
+        node=self
+        for k in keys:
+            node=node.children[k]
+        return node
+
     def set(self, tree_node, *keys):
         self.get(*keys[:-1]).children[keys[-1]]=tree_node
-    
+
     def to_prettystr(self, depth=0) -> str:
-        offset="  "*depth+"|-"
-        pretty=f"TreeNode({self.value})\n"
-        for k,v in self.children.items():
-            pretty+=f"{offset}{k}: {v.to_prettystr(depth+1)}"
-        return pretty
-    
+        pretty=[f"TreeNode({self.value})\n"]
+        stack=[(k, v, depth) for k, v in reversed(self.children.items())]
+        while stack:
+            k, node, d=stack.pop()
+            pretty.append(f"{'  '*d}|-{k}: TreeNode({node.value})\n")
+            stack.extend((kc, vc, d+1) for kc, vc in reversed(node.children.items()))
+        return "".join(pretty)
+
     def __repr__(self) -> str:
         return self.to_prettystr()
-    
+
     def update(self, tree_node, *keys):
-        subtree=self.get(*keys)
-        subtree.value=tree_node.value
-        for k,v in tree_node.children.items():
-            if k in subtree.children:
-                subtree.children[k].update(v)
-            else:
-                subtree.children[k]=v
+        stack=[(self.get(*keys), tree_node)]
+        while stack:
+            subtree, source=stack.pop()
+            subtree.value=source.value
+            for k,v in source.children.items():
+                if k in subtree.children:
+                    stack.append((subtree.children[k], v))
+                else:
+                    subtree.children[k]=v
 
     def copy(self):
         copy=TreeNode(self.value)
-        for k,v in self.children.items():
-            copy.children[k]=v.copy()
+        stack=[(self, copy)]
+        while stack:
+            node, node_copy=stack.pop()
+            for k,v in node.children.items():
+                child=node_copy.children[k]=TreeNode(v.value)
+                if v.children:
+                    stack.append((v, child))
         return copy
-    
+
+    def shallow_copy(self):
+        """Copy of this node, which shares the children with this node. The copy is not shared."""
+        return TreeNode(self.value, dict(self.children))
+
+    def share(self):
+        """Mark this node and all its descendants as shared.
+
+        Since all descendants of a shared node are shared, sharing a tree again is cheap.
+
+        Returns
+        -------
+        TreeNode
+            The node itself.
+        """
+        stack=[self]
+        while stack:
+            node=stack.pop()
+            if not node.shared:
+                node.shared=True
+                stack.extend(node.children.values())
+        return self
+
+    def merged(self, tree_node):
+        """Return the result of `update()` without modifying any of the two trees.
+
+        Subtrees which are only present in one of the trees are not copied, but shared with the result.
+        Call `share()` on both trees before, if they are modified later.
+
+        Parameters
+        ----------
+        tree_node : TreeNode
+            The tree with the new values.
+
+        Returns
+        -------
+        TreeNode
+            The merged tree.
+        """
+        merged=TreeNode(tree_node.value, dict(self.children))
+        stack=[(merged, tree_node)]
+        while stack:
+            node, source=stack.pop()
+            for k,v in source.children.items():
+                if k in node.children:
+                    child=node.children[k]=TreeNode(v.value, dict(node.children[k].children))
+                    stack.append((child, v))
+                else:
+                    node.children[k]=v
+        return merged
+
     def set_all(self, value, *keys):
-        if len(keys)==0:
-            self.value=value
-            for k,v in self.children.items():
-                v.set_all(value)
-        else:
-            self.children[keys[0]].set_all(value, *keys[1:])
-    
+        stack=[self.get(*keys)]
+        while stack:
+            node=stack.pop()
+            node.value=value
+            stack.extend(node.children.values())
+
     def make_leaf(self, *keys):
         self.get(*keys).children={}
-    
+
     def map(self, function):
-        self.value=function(self.value)
-        for k,v in self.children.items():
-            v.map(function)
-    
+        """Apply a function to the values of all nodes, in depth-first order."""
+        stack=[self]
+        while stack:
+            node=stack.pop()
+            node.value=function(node.value)
+            stack.extend(reversed(node.children.values()))
+
     def match_depth_first(self, *keys):
-        if len(keys)==0:
-            return self
-        for k,v in self.children.items():
-            result=None
-            if k==keys[0]:
-                result=v.match_depth_first(*keys[1:])
-            else:
-                result=v.match_depth_first(*keys)
-            if result is not None:
-                return result
+        path=self.match_depth_first_path(*keys)
+        if path is None:
+            return None
+        return self.get(*path)
+
+    def match_depth_first_path(self, *keys):
+        """Like `match_depth_first`, but return the key path of the matching node or None."""
+        #Each state is a node, the number of keys matched so far and the path to the node
+        stack=[(self, 0, ())]
+        while stack:
+            node, matched, path=stack.pop()
+            if matched==len(keys):
+                return path
+            for k,v in reversed(node.children.items()):
+                stack.append((v, matched+1 if k==keys[matched] else matched, path+(k,)))
         return None
-    
+
     def filter_any(self, filter_func=lambda x: bool(x.value)):
         """Return the smallest possible subtree which contains all nodes for which filter_func returns True
 
@@ -99,18 +189,28 @@ class TreeNode(object):
         TreeNode or None
             The filtered subtree or None if no node matches the filter.
         """
-        filtered_children={}
-        for k,v in self.children.items():
-            filtered=v.filter_any(filter_func)
-            if filtered is not None:
-                filtered_children[k]=filtered
-        if len(filtered_children)>0:
-            return TreeNode(self.value, filtered_children)
-        elif filter_func(self):
-            return TreeNode(self.value)
-        else:
-            return None
-        
+        result=None
+        #Each frame contains a node, an iterator over its remaining children, its filtered children and where to put the result
+        stack=[(self, iter(self.children.items()), {}, None, None)]
+        while stack:
+            node, children, filtered_children, parent_filtered, key=stack[-1]
+            for k,v in children:
+                stack.append((v, iter(v.children.items()), {}, filtered_children, k))
+                break
+            else: #all children are filtered
+                stack.pop()
+                if len(filtered_children)>0:
+                    filtered=TreeNode(node.value, filtered_children)
+                elif filter_func(node):
+                    filtered=TreeNode(node.value)
+                else:
+                    filtered=None
+                if parent_filtered is None:
+                    result=filtered
+                elif filtered is not None:
+                    parent_filtered[key]=filtered
+        return result
+
     def select(self, selection_tree):
         """Return a subtree which contains all nodes which are in selection_tree
 
@@ -124,10 +224,12 @@ class TreeNode(object):
         TreeNode
             The selected subtree
         """
-        selected_children={}
-        for k,v in self.children.items():
-            if k in selection_tree.children:
-                selected_children[k]=v.select(selection_tree.children[k])
-        return TreeNode(self.value, selected_children)
-
-
+        selected=TreeNode(self.value)
+        stack=[(self, selection_tree, selected)]
+        while stack:
+            node, selection, node_selected=stack.pop()
+            for k,v in node.children.items():
+                if k in selection.children:
+                    child=node_selected.children[k]=TreeNode(v.value)
+                    stack.append((v, selection.children[k], child))
+        return selected
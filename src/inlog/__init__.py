@@ -1,5 +1,8 @@
 from .Logger import Logger
 from .loaders import load_yaml, load_ini, load_json
+from .hashing import verify_log
+from .provenance import ProvenanceStore
+from .schema import Schema, Field
 __version__ = "2.2.3"
 
 
@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 import sys
-import json
 from pathlib import Path
 import hashlib
 import argparse
 import random
+from inlog import logfiles
 
 def make_nodes_noloop(jlog, filename, id, result):
     filename=Path(filename).name
@@ -21,7 +21,10 @@ def make_nodes_noloop(jlog, filename, id, result):
 def _hash_name(name):
     return hashlib.md5(name.encode()).hexdigest()
 
-def make_nodes(jlog, filename, result):
+def make_nodes(jlog, filename, result, store=None):
+    if store is None:
+        store={}
+    store.update(jlog.get(logfiles.STORE_KEY, {})) #logs with referenced dependencies. Keys are content hashes, so stores can be merged.
     self_hash=_hash_name(filename)
     filename=Path(filename).name
     result.append(f"    id_{self_hash}[{filename}]")
@@ -30,7 +33,7 @@ def make_nodes(jlog, filename, result):
     if "dependencies" in jlog and len(jlog["dependencies"])>0:
         for name, dep in jlog["dependencies"].items():
             dep_hash=_hash_name(name)
-            make_nodes(dep, name, result)
+            make_nodes(logfiles.resolve_dependency(dep, store), name, result, store)
             progamname=Path(jlog["program"]).name
             result.append(f"    id_{dep_hash} --> |{progamname}| id_{self_hash}")
     else: #no dependencies: create a unique dummy node "No Dependencies"
@@ -44,9 +47,7 @@ def main():
     parser.add_argument('jlog', type=str, help='log file in json format')
     args = parser.parse_args()
 
-    jlog={}
-    with open(args.jlog, 'r') as f:
-        jlog.update(json.load(f))
+    jlog=logfiles.read_log(args.jlog)[0] #text logs are shown as single node
 
     mermaid_code=["%% The following lines are code for the mermaid charting application."]
     mermaid_code.append("%% Paste them into the mermaid live editor at https://mermaid.live to see the flowchart.")
@@ -0,0 +1,452 @@
+import hashlib
+import json
+import os
+import time
+import concurrent.futures
+import functools
+import threading
+import warnings
+from pathlib import Path
+from inlog import logfiles
+try:
+    import blake3
+    _has_blake3=True
+except ImportError:
+    _has_blake3=False
+try:
+    import xxhash
+    _has_xxhash=True
+except ImportError:
+    _has_xxhash=False
+
+#Available hash algorithms. The values are constructors of hash objects with update() and hexdigest() methods.
+ALGORITHMS={"sha256": hashlib.sha256, "blake2b": hashlib.blake2b}
+if _has_blake3:
+    ALGORITHMS["blake3"]=blake3.blake3
+if _has_xxhash: #fast, but not cryptographic
+    ALGORITHMS["xxh64"]=xxhash.xxh64
+    ALGORITHMS["xxh3_128"]=xxhash.xxh3_128
+DEFAULT_ALGORITHM="sha256"
+
+def _get_algorithm(algorithm):
+    try:
+        return ALGORITHMS[algorithm]
+    except KeyError:
+        raise ValueError(f"Unknown or unavailable hash algorithm: {algorithm}. Available are: {list(ALGORITHMS)}") from None
+
+BLOCK_SIZE=1<<20 # The size of each read from the file. Large blocks reduce the number of syscalls for big files.
+
+def hash_file(file, algorithm=DEFAULT_ALGORITHM, block_size=None):
+    """
+    Calculate the hash of a file.
+
+    The file is read into a reused buffer, so no new objects are allocated per block.
+
+    Parameters
+    ----------
+    file : str or Path
+        The path of the file
+    algorithm : str, optional
+        The hash algorithm, one of `ALGORITHMS`. (default: 'sha256')
+    block_size : int, optional
+        The size of each read from the file. If None, `hashlib.file_digest` is used on Python 3.11+ and `BLOCK_SIZE` otherwise. (default: None)
+
+    Returns
+    -------
+    str
+        The hexadecimal hash of the file.
+    """
+    constructor=_get_algorithm(algorithm)
+    with open(file, 'rb', buffering=0) as f:
+        if block_size is None and hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, constructor).hexdigest()
+        file_hash = constructor()
+        buffer = bytearray(block_size or BLOCK_SIZE)
+        view = memoryview(buffer)
+        n = f.readinto(buffer)
+        while n:
+            file_hash.update(view[:n])
+            n = f.readinto(buffer)
+    return file_hash.hexdigest()
+
+
+FINGERPRINT_CHUNKS=16 # Number of chunks between head and tail of the file in a fingerprint
+FINGERPRINT_CHUNK_SIZE=1<<20
+
+def fingerprint_file(file, algorithm=DEFAULT_ALGORITHM, chunks=FINGERPRINT_CHUNKS, chunk_size=FINGERPRINT_CHUNK_SIZE):
+    """
+    Calculate a fast fingerprint of a file.
+
+    The fingerprint is the hash of the file size, the head and the tail of the file and `chunks` evenly spaced chunks in between.
+    Unlike a full hash, it does not detect all modifications of the file. Files smaller than (chunks+2)*chunk_size are hashed completely (including the size).
+
+    Parameters
+    ----------
+    file : str or Path
+        The path of the file
+    algorithm : str, optional
+        The hash algorithm, one of `ALGORITHMS`. (default: 'sha256')
+    chunks : int, optional
+        Number of chunks between head and tail. (default: FINGERPRINT_CHUNKS)
+    chunk_size : int, optional
+        Size of each chunk in bytes. (default: FINGERPRINT_CHUNK_SIZE)
+
+    Returns
+    -------
+    str
+        The hexadecimal fingerprint of the file.
+    """
+    file_hash=_get_algorithm(algorithm)()
+    with open(file, 'rb', buffering=0) as f:
+        size=os.fstat(f.fileno()).st_size
+        file_hash.update(size.to_bytes(8, "little"))
+        if size<=(chunks+2)*chunk_size:
+            offsets=range(0, size, chunk_size)
+        else:
+            offsets=[round(i*(size-chunk_size)/(chunks+1)) for i in range(chunks+2)]
+        buffer=bytearray(chunk_size)
+        view=memoryview(buffer)
+        for offset in offsets:
+            f.seek(offset)
+            n=f.readinto(buffer)
+            file_hash.update(view[:n])
+    return file_hash.hexdigest()
+
+
+def hash_files(files, algorithm=DEFAULT_ALGORITHM, cache=None, max_workers=1, executor="thread", block_size=None, fingerprint=None):
+    """
+    Calculate the hashes of multiple files concurrently.
+
+    Parameters
+    ----------
+    files : list of str or Path
+        The paths of the files
+    algorithm : str, optional
+        The hash algorithm, one of `ALGORITHMS`. (default: 'sha256')
+    cache : HashCache, optional
+        Cache to look up and store the hashes. (default: None)
+    max_workers : int, optional
+        Maximum number of files hashed at the same time. If None, the default of the executor is used. (default: 1)
+    executor : str, optional
+        Can be 'thread' or 'process'. Since hashlib releases the GIL for large buffers, threads are usually sufficient. (default: 'thread')
+    block_size : int, optional
+        The size of each read from the files, see `hash_file`. (default: None)
+    fingerprint : tuple, optional
+        If given as (chunks, chunk_size), only fingerprints of the files are calculated, see `fingerprint_file`. (default: None)
+
+    Returns
+    -------
+    list of str
+        The hexadecimal hashes, in the same order as `files`.
+    """
+    _get_algorithm(algorithm)
+    if fingerprint is None:
+        hash_func=functools.partial(hash_file, algorithm=algorithm, block_size=block_size)
+        cache_key=algorithm
+    else:
+        hash_func=functools.partial(fingerprint_file, algorithm=algorithm, chunks=fingerprint[0], chunk_size=fingerprint[1])
+        cache_key=f"{algorithm}/fingerprint{fingerprint[0]}x{fingerprint[1]}"
+    hashes=[None]*len(files)
+    missing=[]
+    for i, file in enumerate(files):
+        if cache is not None:
+            hashes[i]=cache.lookup(file, cache_key)
+        if hashes[i] is None:
+            missing.append(i)
+    if cache is not None:
+        stats=[os.stat(files[i]) for i in missing]
+    if max_workers==1 or len(missing)<=1:
+        results=[hash_func(files[i]) for i in missing]
+    else:
+        if executor=="thread":
+            pool=concurrent.futures.ThreadPoolExecutor(max_workers)
+        elif executor=="process":
+            pool=concurrent.futures.ProcessPoolExecutor(max_workers)
+        else:
+            raise ValueError(f"Unknown executor: {executor}")
+        with pool:
+            results=list(pool.map(hash_func, [files[i] for i in missing]))
+    for j, i in enumerate(missing):
+        hashes[i]=results[j]
+        if cache is not None:
+            cache.store(files[i], results[j], stats[j], cache_key)
+    return hashes
+
+
+def file_state(stat):
+    """The state of a file used to detect modifications: size, modification time and inode.
+
+    Parameters
+    ----------
+    stat : os.stat_result
+        The stat of the file
+
+    Returns
+    -------
+    list
+        [size, mtime_ns, inode]
+    """
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+
+def default_cache_dir():
+    """Directory of the default hash cache.
+
+    This is `$INLOG_CACHE_DIR` if set, otherwise `$XDG_CACHE_HOME/inlog` or `~/.cache/inlog`.
+    """
+    if "INLOG_CACHE_DIR" in os.environ:
+        return Path(os.environ["INLOG_CACHE_DIR"])
+    cache_home=os.environ.get("XDG_CACHE_HOME", "")
+    if not os.path.isabs(cache_home): #empty or relative values are ignored, like the XDG specification requires
+        cache_home=Path.home()/".cache"
+    return Path(cache_home)/"inlog"
+
+_default_cache=None
+
+#Seconds before storing a hash in which a modification of the file makes the cache entry untrustworthy. Covers coarse timestamps, e.g. on FAT or NFS.
+RACY_WINDOW=2
+
+def default_cache():
+    """Get the hash cache shared by all Logger objects.
+
+    Returns None if caching is disabled by setting the environment variable `INLOG_HASH_CACHE=0`.
+    """
+    global _default_cache
+    if os.environ.get("INLOG_HASH_CACHE", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    if _default_cache is None:
+        _default_cache=HashCache()
+    return _default_cache
+
+
+class HashCache(object):
+    """Persistent cache of file hashes.
+
+    Entries are stored as JSON lines in `cache_dir/hashes.jsonl`. They are keyed on the resolved path and the hash algorithm and
+    validated against the size, modification time and inode of the file. If any of them changed, the entry is stale
+    and the file is hashed again. Hence, looking up an unchanged file costs only one `stat()` call.
+    Entries of files which were modified less than `RACY_WINDOW` seconds before the hash was stored are not trusted, since a later modification might not have changed the modification time.
+    Such files are hashed again, until an entry is stored long enough after the last modification.
+    """
+
+    FILENAME="hashes.jsonl"
+
+    def __init__(self, cache_dir=None, max_entries=10000):
+        """
+        Parameters
+        ----------
+        cache_dir : str or Path, optional
+            Directory of the cache file. (default: `default_cache_dir()`)
+        max_entries : int, optional
+            Maximum number of entries kept. The oldest entries are evicted first. (default: 10000)
+        """
+        if cache_dir is None:
+            cache_dir=default_cache_dir()
+        self.path=Path(cache_dir)/self.FILENAME
+        self.max_entries=max_entries
+        self._entries={}
+        self._offset=0 #bytes of the cache file already read
+        self._lines=0 #lines in the cache file, including overwritten entries
+        self._failed=False
+        self._lock=threading.RLock()
+
+    @staticmethod
+    def _key(path, algorithm):
+        return path+"\0"+algorithm
+
+    def _refresh(self):
+        """Read entries appended to the cache file since the last call (possibly by other processes)."""
+        with self._lock:
+            self._refresh_locked()
+
+    def _refresh_locked(self):
+        try:
+            size=self.path.stat().st_size
+        except FileNotFoundError:
+            size=0
+        if size<self._offset: #file was compacted in the meantime
+            self._entries={}
+            self._offset=0
+            self._lines=0
+        if size==self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"): #incomplete line, currently being written
+                    break
+                self._offset+=len(line)
+                self._lines+=1
+                try:
+                    entry=json.loads(line)
+                    self._entries[self._key(entry["path"], entry["algorithm"])]=entry
+                except (ValueError, KeyError):
+                    continue
+
+    def lookup(self, file, algorithm=DEFAULT_ALGORITHM):
+        """Get the cached hash of a file.
+
+        Parameters
+        ----------
+        file : str or Path
+            The path of the file
+        algorithm : str, optional
+            The hash algorithm. (default: 'sha256')
+
+        Returns
+        -------
+        str or None
+            The cached hash or None if there is no valid entry.
+        """
+        path=str(Path(file).resolve())
+        stat=os.stat(path)
+        if self._failed:
+            return None
+        try:
+            self._refresh()
+        except OSError as e:
+            self._disable(e)
+            return None
+        entry=self._entries.get(self._key(path, algorithm))
+        if entry is None or entry["stat"]!=file_state(stat):
+            return None
+        #Racy entries: a file modified shortly before its hash was stored might have been modified again within the timestamp granularity of the file system, without changing its state.
+        if stat.st_mtime_ns>=(entry["time"]-RACY_WINDOW)*1e9:
+            return None
+        return entry["hash"]
+
+    def store(self, file, file_hash, stat=None, algorithm=DEFAULT_ALGORITHM):
+        """Add the hash of a file to the cache.
+
+        If the cache file cannot be read or written, a warning is issued once and the cache is disabled.
+
+        Parameters
+        ----------
+        file : str or Path
+            The path of the file
+        file_hash : str
+            The hash of the file
+        stat : os.stat_result, optional
+            The stat of the file at the time of hashing. (default: stat the file now)
+        algorithm : str, optional
+            The hash algorithm. (default: 'sha256')
+        """
+        if self._failed:
+            return
+        path=str(Path(file).resolve())
+        if stat is None:
+            stat=os.stat(path)
+        entry={"path": path, "algorithm": algorithm, "stat": file_state(stat), "hash": file_hash, "time": time.time()}
+        line=(json.dumps(entry)+"\n").encode()
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._refresh()
+                with open(self.path, "ab") as f:
+                    f.write(line)
+            except OSError as e:
+                self._disable(e)
+                return
+            self._entries[self._key(path, algorithm)]=entry
+            self._offset+=len(line)
+            self._lines+=1
+            if self._lines>2*self.max_entries:
+                try:
+                    self.evict()
+                except OSError as e:
+                    self._disable(e)
+
+    def evict(self):
+        """Compact the cache file, keeping only the newest `max_entries` entries of existing files."""
+        with self._lock:
+            self._refresh()
+            entries=[e for e in self._entries.values() if os.path.exists(e["path"])]
+            entries=sorted(entries, key=lambda e: e["time"])[-self.max_entries:]
+            tmp=self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            try:
+                with open(tmp, "w") as f:
+                    f.writelines(json.dumps(e)+"\n" for e in entries)
+                os.replace(tmp, self.path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+            self._entries={self._key(e["path"], e["algorithm"]): e for e in entries}
+            self._offset=self.path.stat().st_size
+            self._lines=len(entries)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._entries={}
+            self._offset=0
+            self._lines=0
+            if self.path.exists():
+                self.path.unlink()
+
+    def _disable(self, error):
+        warnings.warn(f"Hash cache {self.path} not usable, hashing without cache: {error}")
+        self._failed=True
+
+    def hash_file(self, file, algorithm=DEFAULT_ALGORITHM):
+        """
+        Calculate the hash of a file, using the cache if possible.
+
+        Parameters
+        ----------
+        file : str or Path
+            The path of the file
+        algorithm : str, optional
+            The hash algorithm, one of `ALGORITHMS`. (default: 'sha256')
+
+        Returns
+        -------
+        str
+            The hexadecimal hash of the file.
+        """
+        return hash_files([file], algorithm, cache=self)[0]
+
+
+def verify_log(logfile, upgrade=False, cache=None):
+    """
+    Verify the hashes of the output files listed in a log in json format.
+
+    Parameters
+    ----------
+    logfile : str or Path
+        The path of the log
+    upgrade : bool, optional
+        If True, fingerprints of successfully verified files are replaced by full hashes and the log is rewritten. (default: False)
+    cache : HashCache, optional
+        Cache to look up and store the hashes. (default: None)
+
+    Returns
+    -------
+    dict
+        For each output file, True if the hash (or fingerprint) matches, False if it does not match or the file does not exist.
+    """
+    log, log_format=logfiles.read_log(logfile)
+    if log_format!="json":
+        raise ValueError(f"Only logs in json format can be verified: {logfile}")
+    result={}
+    upgraded=False
+    for entry in log.get("output_files", []):
+        path=entry["path"]
+        algorithm=entry.get("algorithm", DEFAULT_ALGORITHM) #older logs contain only sha256 hashes
+        fingerprint=entry.get("fingerprint")
+        if fingerprint is not None:
+            fingerprint=(fingerprint["chunks"], fingerprint["chunk_size"])
+        try:
+            result[path]=hash_files([path], algorithm, cache=cache, fingerprint=fingerprint)[0]==entry["hash"]
+        except FileNotFoundError:
+            result[path]=False
+        if upgrade and fingerprint is not None and result[path]:
+            entry["hash"]=hash_files([path], algorithm, cache=cache)[0]
+            del entry["fingerprint"]
+            upgraded=True
+    if upgraded:
+        tmp=Path(f"{logfile}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(log, f, indent=4, default=str)
+        os.replace(tmp, logfile)
+    return result
@@ -1,12 +1,65 @@
 from .Logger import Logger
+from .Tree import TreeNode
 import configparser
 from pathlib import Path
 import json
+import os
+import threading
+from collections import OrderedDict
 try:
     import yaml
     _has_yaml=True
+    _YamlLoader=getattr(yaml, "CSafeLoader", yaml.SafeLoader) #libyaml based loader, if available
 except ImportError:
     _has_yaml=False
+try:
+    import orjson
+    _has_orjson=True
+except ImportError:
+    _has_orjson=False
+
+#In-process cache of parsed config files: (reader, resolved path, mtime, size) -> shared TreeNode of the options
+PARSE_CACHE_SIZE=64
+_parse_cache=OrderedDict()
+_parse_cache_lock=threading.Lock()
+
+def clear_parse_cache():
+    """Remove all entries from the cache of parsed config files."""
+    with _parse_cache_lock:
+        _parse_cache.clear()
+
+def _read_cached(path, read, cache):
+    """Read a config file, using the cache of parsed config files if requested.
+
+    Parameters
+    ----------
+    path : Path
+        The config file.
+    read : function
+        Function which parses the file and returns the dictionary and the name of the parser.
+    cache : bool
+        Whether to use the cache.
+
+    Returns
+    -------
+    tuple
+        The options and the name of the parser. Cached options are returned as shared TreeNode, so Loggers can be created from them without copying (see `Logger()`).
+    """
+    if not cache:
+        return read(path)
+    stat=os.stat(path)
+    key=(read, str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    with _parse_cache_lock:
+        if key in _parse_cache:
+            _parse_cache.move_to_end(key)
+            return _parse_cache[key]
+    options, loader=read(path)
+    entry=(TreeNode.from_leafdict(options or {}).share(), loader)
+    with _parse_cache_lock:
+        _parse_cache[key]=entry
+        while len(_parse_cache)>PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    return entry
 
 def _configparser_to_dict(configparser):
         options={}
@@ -17,7 +70,40 @@ def _configparser_to_dict(configparser):
                 options[sec][key]=configparser[sec][key]
         return options
 
-def load_ini(ini_file, version=None, def_opts=None):
+def _new_config_parser():
+    config = configparser.ConfigParser()
+    config._interpolation = configparser.ExtendedInterpolation()
+    return config
+
+def _read_ini(p):
+    if not p.exists(): #since configparser does not raise an error if the file does not exist
+        raise FileNotFoundError("File not found: "+str(p))
+    config=_new_config_parser()
+    config.read(p)
+    return _configparser_to_dict(config), "configparser"
+
+def _parse_yaml(stream):
+    """Parse yaml with the fastest safe loader."""
+    return yaml.load(stream, Loader=_YamlLoader), "yaml."+_YamlLoader.__name__
+
+def _parse_json(data):
+    """Parse json with orjson, if available, and the json module otherwise."""
+    if _has_orjson:
+        try:
+            return orjson.loads(data), "orjson"
+        except orjson.JSONDecodeError: #orjson is stricter, e.g. it does not accept NaN
+            pass
+    return json.loads(data), "json"
+
+def _read_yaml(p):
+    with open(p) as f:
+        return _parse_yaml(f)
+
+def _read_json(p):
+    with open(p, "rb") as f:
+        return _parse_json(f.read())
+
+def load_ini(ini_file, version=None, def_opts=None, cache=False):
     """Create a logger object from an ini file
 
     Parameters
@@ -28,27 +114,29 @@ def load_ini(ini_file, version=None, def_opts=None):
         Version of your program
     def_opts : dict, optional
         Default parameters, used as a fallback if not present in the config file. by default None
+    cache : bool, optional
+        Cache the parsed file in memory, keyed on path, modification time and size. Loading an unchanged file again skips parsing, and the options are shared between the Loggers instead of copied. Only used for paths, not for file-like objects. The cache size is `inlog.loaders.PARSE_CACHE_SIZE`. (default: False)
 
     Returns
     -------
     Logger
         The logger object
     """
-    config = configparser.ConfigParser()
-    config._interpolation = configparser.ExtendedInterpolation()
     try: #ini_file is a string or path
         p=Path(ini_file)
-        if not p.exists(): #since configparser does not raise an error if the file does not exist
-            raise FileNotFoundError("File not found: "+str(p))
-        config.read(p)
     except TypeError:
+        config=_new_config_parser()
         config.read_file(ini_file) #ini_file is a file-like object
-    config_dict= _configparser_to_dict(config)
+        config_dict= _configparser_to_dict(config)
+        loader="configparser"
+    else:
+        config_dict, loader=_read_cached(p, _read_ini, cache)
     logger=Logger(config_dict, version, def_opts=def_opts)
     logger.filename=ini_file
+    logger.loader=loader
     return logger
 
-def load_yaml(yaml_file, version=None, def_opts=None):
+def load_yaml(yaml_file, version=None, def_opts=None, cache=False):
     """Create a logger object from a yaml file
 
     Parameters
@@ -59,6 +147,8 @@ def load_yaml(yaml_file, version=None, def_opts=None):
         Version of your program
     def_opts : dict, optional
         Default parameters, used as a fallback if not present in the config file. by default None
+    cache : bool, optional
+        Cache the parsed file in memory, keyed on path, modification time and size. Loading an unchanged file again skips parsing, and the options are shared between the Loggers instead of copied. Only used for paths, not for file-like objects. The cache size is `inlog.loaders.PARSE_CACHE_SIZE`. (default: False)
 
     Returns
     -------
@@ -69,15 +159,16 @@ def load_yaml(yaml_file, version=None, def_opts=None):
         raise ImportError("You need to install pyyaml to use yaml files (contained in inlog[extras])")
     try:
         p=Path(yaml_file)
-        with open(p) as f:
-            config_dict = yaml.safe_load(f)
     except TypeError:
-        config_dict = yaml.safe_load(yaml_file)
+        config_dict, loader = _parse_yaml(yaml_file)
+    else:
+        config_dict, loader=_read_cached(p, _read_yaml, cache)
     logger=Logger(config_dict, version, def_opts=def_opts)
     logger.filename=yaml_file
+    logger.loader=loader
     return logger
 
-def load_json(json_file, version=None, def_opts=None):
+def load_json(json_file, version=None, def_opts=None, cache=False):
     """Create a logger object from a json file
 
     Parameters
@@ -88,6 +179,8 @@ def load_json(json_file, version=None, def_opts=None):
         Version of your program
     def_opts : dict, optional
         Default parameters, used as a fallback if not present in the config file. by default None
+    cache : bool, optional
+        Cache the parsed file in memory, keyed on path, modification time and size. Loading an unchanged file again skips parsing, and the options are shared between the Loggers instead of copied. Only used for paths, not for file-like objects. The cache size is `inlog.loaders.PARSE_CACHE_SIZE`. (default: False)
 
     Returns
     -------
@@ -96,10 +189,11 @@ def load_json(json_file, version=None, def_opts=None):
     """
     try:
         p=Path(json_file)
-        with open(p) as f:
-            config_dict = json.load(f)
     except TypeError:
-        config_dict = json.load(json_file)
+        config_dict, loader = _parse_json(json_file.read())
+    else:
+        config_dict, loader=_read_cached(p, _read_json, cache)
     logger=Logger(config_dict, version, def_opts=def_opts)
     logger.filename=json_file
+    logger.loader=loader
     return logger
\ No newline at end of file
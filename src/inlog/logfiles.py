@@ -0,0 +1,373 @@
+import hashlib
+import json
+import io
+import itertools
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+#In logs with referenced dependencies, each dependency is replaced by {REF_KEY: content hash}.
+#The referenced logs are stored once in the top level dictionary STORE_KEY: {content hash: log}.
+REF_KEY="$ref"
+STORE_KEY="log_store"
+
+#In-process cache of old logs read as dependencies: (resolved path, inode, mtime, size) -> (log, encoded log)
+DEPENDENCY_CACHE_SIZE=64
+_dependency_cache=OrderedDict()
+_dependency_cache_lock=threading.Lock()
+
+def is_reference(dependency):
+    """Check whether a dependency entry is a reference to a log in the log store."""
+    return isinstance(dependency, dict) and set(dependency.keys())=={REF_KEY}
+
+def json_default(obj):
+    """Serialize objects which are not supported by json: arrays (e.g. numpy) as lists, everything else as string."""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    return str(obj)
+
+LINK_MODES=(None, "hardlink", "symlink")
+
+def encode_lines(lines, batch=4096):
+    """Join lines with line breaks and encode them in batches, for `write_stream()`."""
+    lines=iter(lines)
+    first=True
+    while True:
+        chunk=list(itertools.islice(lines, batch))
+        if not chunk:
+            return
+        data="\n".join(chunk)
+        yield (data if first else "\n"+data).encode()
+        first=False
+
+def write_files(data, paths, link=None):
+    """Write the same content to multiple files.
+
+    Parameters
+    ----------
+    data : bytes
+        The encoded content.
+    paths : list of Path
+        The files to write.
+    link : str, optional
+        If 'hardlink' or 'symlink', only the first file is written and all other files are links to it.
+        If a link cannot be created, e.g. on file systems without hardlinks, the content is written instead. (default: None)
+    """
+    write_stream([data], paths, link)
+
+def write_stream(chunks, paths, link=None):
+    """Write content, which is generated incrementally, to multiple files.
+
+    The chunks are written to the first file. All other files are copies of or links to the first file, see `write_files()`.
+
+    Parameters
+    ----------
+    chunks : iterable of bytes
+        The encoded content.
+    paths : list of Path
+        The files to write.
+    link : str, optional
+        None, 'hardlink' or 'symlink'. (default: None)
+    """
+    if link not in LINK_MODES:
+        raise ValueError(f"Unknown link mode: {link}")
+    first=None
+    for path in paths:
+        path=Path(path)
+        #Files are replaced instead of overwritten, so readers never see partial files and links from earlier calls are not followed
+        tmp=path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            linked=False
+            if first is not None and link is not None:
+                try:
+                    if link=="hardlink":
+                        os.link(first, tmp)
+                    else:
+                        os.symlink(first.resolve(), tmp)
+                    linked=True
+                except OSError:
+                    pass
+            if first is None:
+                with open(tmp, "wb") as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+            elif not linked:
+                shutil.copyfile(first, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.lexists(tmp):
+                os.unlink(tmp)
+            raise
+        if first is None:
+            first=path
+
+def json_key(key):
+    """Encode a dictionary key like the json module."""
+    if not isinstance(key, str):
+        if key is True:
+            key="true"
+        elif key is False:
+            key="false"
+        elif key is None:
+            key="null"
+        elif isinstance(key, (int, float)):
+            key=json.dumps(key)
+        else:
+            raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
+    return json.encoder.encode_basestring_ascii(key)
+
+def json_value(value):
+    """Encode a value like `json.dumps(value, indent=4)`, with `json_default` for unsupported objects."""
+    if type(value) is str:
+        return json.encoder.encode_basestring_ascii(value)
+    if type(value) is int:
+        return int.__repr__(value)
+    return json.dumps(value, indent=4, default=json_default)
+
+def _first_line(f):
+    """Read the blank lines at the start of a text file and its first non-blank line, which is "" for files without one."""
+    leading=[]
+    for line in f:
+        if line.strip():
+            return leading, line
+        leading.append(line)
+    return leading, ""
+
+#characters a json document can start with, including the NaN and Infinity extensions of the json module
+_JSON_START=tuple('{["-0123456789tfnNI')
+
+def _could_be_json(line):
+    """Whether a file starting with the given first non-blank line could be a json document."""
+    return line.lstrip().startswith(_JSON_START)
+
+def read_log(path):
+    """Read a log file in json or txt format.
+
+    The file is read exactly once. Files are parsed as json, if their first non-whitespace character can start a json document, e.g. '{' or '['.
+    Files which are no valid json are read as text logs.
+
+    Parameters
+    ----------
+    path : str or Path
+        The log file.
+
+    Returns
+    -------
+    tuple
+        The log and its format, 'json' or 'txt'. Text logs are returned as {"text": lines}, like dependencies in json logs.
+    """
+    with open(path, "r") as f:
+        leading, line=_first_line(f)
+        if not _could_be_json(line):
+            return {"text": leading+([line] if line else [])+f.readlines()}, "txt"
+        text="".join(leading)+line+f.read()
+    try:
+        return json.loads(text), "json"
+    except json.decoder.JSONDecodeError:
+        return {"text": io.StringIO(text).readlines()}, "txt"
+
+def iter_dependency_json(path, pad=""):
+    """Generate the lines of a log file as json value, with bounded memory.
+
+    The lines are the same as the lines of `json.dumps(read_log(path)[0], indent=4)`.
+    Text logs are converted to {"text": [lines]} line by line. Json logs are parsed, to validate them, but encoded incrementally.
+
+    Parameters
+    ----------
+    path : str or Path
+        The log file.
+    pad : str, optional
+        Indentation of all lines except the first one. (default: "")
+
+    Yields
+    ------
+    str
+        The lines, without line breaks.
+    """
+    with open(path, "r") as f:
+        #the format is detected like in read_log()
+        leading, line=_first_line(f)
+        if _could_be_json(line):
+            text="".join(leading)+line+f.read()
+            try:
+                log=json.loads(text)
+            except json.decoder.JSONDecodeError:
+                lines=io.StringIO(text).readlines()
+            else:
+                del text
+                yield from _iter_json_lines(log, pad)
+                return
+        else:
+            lines=itertools.chain(leading, [line] if line else [], f)
+        yield "{"
+        previous=None
+        for line in lines:
+            if previous is None:
+                yield pad+'    "text": ['
+            else:
+                yield previous+","
+            previous=pad+"        "+json.encoder.encode_basestring_ascii(line)
+        if previous is None:
+            yield pad+'    "text": []'
+        else:
+            yield previous
+            yield pad+"    ]"
+        yield pad+"}"
+
+def _iter_json_lines(value, pad):
+    """Generate the lines of `json.dumps(value, indent=4)`, without holding the complete string in memory."""
+    buffer=""
+    first=True
+    for chunk in json.JSONEncoder(indent=4).iterencode(value):
+        buffer+=chunk
+        if "\n" in chunk:
+            lines=buffer.split("\n")
+            buffer=lines.pop()
+            for line in lines:
+                yield line if first else pad+line
+                first=False
+    yield buffer if first else pad+buffer
+
+def clear_dependency_cache():
+    """Remove all entries from the cache of dependency logs."""
+    with _dependency_cache_lock:
+        _dependency_cache.clear()
+
+def _read_dependency(path):
+    return read_log(path)[0]
+
+def read_dependency(path, cache=False):
+    """Read an old log to embed it as dependency in a json log.
+
+    If requested, logs are cached in memory, keyed on the resolved path, inode, modification time and size of the file, so repeated writes with the same old logs do not read them again.
+    The cache holds at most `DEPENDENCY_CACHE_SIZE` logs. Each cached log takes about twice the size of its file in memory.
+
+    Parameters
+    ----------
+    path : Path
+        The old log, in json or txt format.
+    cache : bool, optional
+        Whether to use the cache. (default: False)
+
+    Returns
+    -------
+    tuple
+        The log as dictionary, with text logs as {"text": lines}, and the log encoded with `json.dumps(log, indent=4)`. Cached logs are shared between calls and must not be modified.
+    """
+    if not cache:
+        log=_read_dependency(path)
+        return log, json.dumps(log, indent=4)
+    stat=os.stat(path)
+    key=(str(Path(path).resolve()), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _dependency_cache_lock:
+        if key in _dependency_cache:
+            _dependency_cache.move_to_end(key)
+            return _dependency_cache[key]
+    log=_read_dependency(path)
+    entry=(log, json.dumps(log, indent=4))
+    with _dependency_cache_lock:
+        _dependency_cache[key]=entry
+        while len(_dependency_cache)>DEPENDENCY_CACHE_SIZE:
+            _dependency_cache.popitem(last=False)
+    return entry
+
+def content_hash(log):
+    """Hash of the json representation of a log, independent of the order of the keys."""
+    return hashlib.sha256(json.dumps(log, sort_keys=True, default=json_default).encode()).hexdigest()
+
+def _store_log(log, store):
+    """Add a log and all its dependencies to the store.
+
+    Parameters
+    ----------
+    log : dict
+        The log. Can contain embedded or referenced dependencies.
+    store : dict
+        The log store, will be modified in place.
+
+    Returns
+    -------
+    str
+        The content hash of the log in the store.
+    """
+    if is_reference(log):
+        return log[REF_KEY]
+    log=dict(log)
+    store.update(log.pop(STORE_KEY, {}))
+    if "dependencies" in log:
+        log["dependencies"]={name: {REF_KEY: _store_log(dep, store)} for name, dep in log["dependencies"].items()}
+    key=content_hash(log)
+    store.setdefault(key, log)
+    return key
+
+def to_reference_log(log):
+    """Convert a log to a log with referenced dependencies.
+
+    Every dependency, including dependencies of dependencies, is stored exactly once in the log store. Therefore, the size of the log grows linearly with the number of ancestors.
+
+    Parameters
+    ----------
+    log : dict
+        The log. Its dependencies can be embedded or referenced.
+
+    Returns
+    -------
+    dict
+        The log with all dependencies replaced by references to the log store.
+    """
+    store={}
+    log=dict(log)
+    store.update(log.pop(STORE_KEY, {}))
+    log["dependencies"]={name: {REF_KEY: _store_log(dep, store)} for name, dep in log.get("dependencies", {}).items()}
+    log[STORE_KEY]=store
+    return log
+
+def resolve_dependency(dependency, store):
+    """Get the log of a dependency entry, looking up references in the store.
+
+    Parameters
+    ----------
+    dependency : dict
+        The dependency entry, either an embedded log or a reference.
+    store : dict
+        The log store.
+
+    Returns
+    -------
+    dict
+        The log of the dependency.
+    """
+    if is_reference(dependency):
+        try:
+            return store[dependency[REF_KEY]]
+        except KeyError:
+            raise KeyError(f"Referenced log {dependency[REF_KEY]} not found in the log store.") from None
+    return dependency
+
+def expand_log(log, store=None):
+    """Convert a log to a log with embedded dependencies.
+
+    Note that the result can be much larger than the log, since common ancestors are repeated for every descendant.
+
+    Parameters
+    ----------
+    log : dict
+        The log. Its dependencies can be embedded or referenced.
+    store : dict, optional
+        Log store of the parent log, used to resolve references. (default: None)
+
+    Returns
+    -------
+    dict
+        The log with all dependencies embedded.
+    """
+    return _expand_log(log, dict(store) if store is not None else {})
+
+def _expand_log(log, store):
+    log=dict(log)
+    store.update(log.pop(STORE_KEY, {})) #keys are content hashes, so stores can be merged
+    if "dependencies" in log:
+        log["dependencies"]={name: _expand_log(resolve_dependency(dep, store), store) for name, dep in log["dependencies"].items()}
+    return log
@@ -0,0 +1,250 @@
+import json
+import sqlite3
+from pathlib import Path
+from inlog import logfiles
+from inlog.Tree import TreeNode
+
+_SCHEMA="""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT UNIQUE NOT NULL,
+    date TEXT,
+    program TEXT,
+    arguments TEXT,
+    version TEXT,
+    input TEXT,
+    runtime TEXT
+);
+CREATE TABLE IF NOT EXISTS logs (
+    path TEXT NOT NULL,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    PRIMARY KEY (path, run_id)
+);
+CREATE TABLE IF NOT EXISTS options (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    key TEXT NOT NULL,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS output_files (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    path TEXT NOT NULL,
+    hash TEXT,
+    algorithm TEXT
+);
+CREATE TABLE IF NOT EXISTS dependencies (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    log_path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_logs_run ON logs(run_id);
+CREATE INDEX IF NOT EXISTS idx_options_key ON options(key);
+CREATE INDEX IF NOT EXISTS idx_options_run ON options(run_id);
+CREATE INDEX IF NOT EXISTS idx_output_files_hash ON output_files(hash);
+CREATE INDEX IF NOT EXISTS idx_output_files_path ON output_files(path);
+CREATE INDEX IF NOT EXISTS idx_output_files_run ON output_files(run_id);
+CREATE INDEX IF NOT EXISTS idx_dependencies_run ON dependencies(run_id);
+CREATE INDEX IF NOT EXISTS idx_dependencies_log ON dependencies(log_path);
+"""
+
+#Runs connected by dependency edges, starting from the runs which produced (ancestors) or used (descendants) a file.
+_ANCESTORS="""
+WITH RECURSIVE related(id) AS (
+    SELECT run_id FROM output_files WHERE path=:path
+    UNION SELECT run_id FROM logs WHERE path=:path
+    UNION
+    SELECT logs.run_id FROM related JOIN dependencies ON dependencies.run_id=related.id JOIN logs ON logs.path=dependencies.log_path
+)
+"""
+_DESCENDANTS="""
+WITH RECURSIVE related(id) AS (
+    SELECT dependencies.run_id FROM dependencies WHERE log_path=:path
+    UNION
+    SELECT dependencies.run_id FROM output_files JOIN logs ON logs.run_id=output_files.run_id JOIN dependencies ON dependencies.log_path=logs.path WHERE output_files.path=:path
+    UNION
+    SELECT dependencies.run_id FROM related JOIN logs ON logs.run_id=related.id JOIN dependencies ON dependencies.log_path=logs.path
+)
+"""
+
+class ProvenanceStore(object):
+    """Local SQLite database of written logs.
+
+    Each log is stored as a run with its options, output files and dependency edges, indexed for fast lookups.
+    Runs are identified by the content hash of their log, so registering the same log twice has no effect.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : str or Path
+            Path of the database file. It is created if it does not exist.
+        """
+        self.path=Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection=sqlite3.connect(str(self.path), timeout=60)
+        self._connection.row_factory=sqlite3.Row
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _register(self, log, log_paths, store):
+        """Insert a log and its dependencies. Must be called inside a transaction.
+
+        Returns
+        -------
+        int
+            The id of the run.
+        """
+        store.update(log.get(logfiles.STORE_KEY, {})) #keys are content hashes, so stores can be merged
+        log={k: v for k, v in log.items() if k!=logfiles.STORE_KEY}
+        cursor=self._connection.cursor()
+        row=cursor.execute("SELECT id FROM runs WHERE content_hash=?", (logfiles.content_hash(log),)).fetchone()
+        if row is not None:
+            run_id=row["id"]
+        else:
+            cursor.execute("INSERT INTO runs (content_hash, date, program, arguments, version, input, runtime) VALUES (?,?,?,?,?,?,?)",
+                (logfiles.content_hash(log), log.get("date"), log.get("program"), json.dumps(log.get("arguments")), None if log.get("version") is None else str(log.get("version")), log.get("input"), log.get("runtime")))
+            run_id=cursor.lastrowid
+            options=log.get("options")
+            if isinstance(options, dict):
+                leafs=[]
+                self._flatten(TreeNode.from_leafdict(options), (), leafs)
+                cursor.executemany("INSERT INTO options (run_id, key, value) VALUES (?,?,?)", [(run_id, json.dumps(k), json.dumps(v, default=logfiles.json_default)) for k, v in leafs])
+            cursor.executemany("INSERT INTO output_files (run_id, path, hash, algorithm) VALUES (?,?,?,?)",
+                [(run_id, f["path"], f.get("hash"), f.get("algorithm", "sha256")) for f in log.get("output_files", [])])
+            for name, dep in log.get("dependencies", {}).items():
+                cursor.execute("INSERT INTO dependencies (run_id, log_path) VALUES (?,?)", (run_id, name))
+                dep=logfiles.resolve_dependency(dep, store)
+                if set(dep.keys())!={"text"}: #text based logs cannot be evaluated
+                    self._register(dep, [name], store)
+        cursor.executemany("INSERT OR IGNORE INTO logs (path, run_id) VALUES (?,?)", [(str(p), run_id) for p in log_paths])
+        return run_id
+
+    @classmethod
+    def _flatten(cls, node, keys, leafs):
+        stack=[(node, keys)]
+        while stack:
+            node, keys=stack.pop()
+            if len(node.children)==0:
+                leafs.append((list(keys), node.value))
+            stack.extend((v, keys+(k,)) for k, v in reversed(list(node.children.items()))) #reversed, to keep the depth-first order
+
+    def register(self, log, log_paths=()):
+        """Add a log and all its dependencies to the store.
+
+        Parameters
+        ----------
+        log : dict
+            The log in json format, with embedded or referenced dependencies.
+        log_paths : iterable of str or Path, optional
+            The files the log was written to.
+
+        Returns
+        -------
+        int
+            The id of the run.
+        """
+        if isinstance(log_paths, (str, Path)):
+            log_paths=[log_paths]
+        log_paths=[str(Path(p).resolve()) for p in log_paths]
+        with self._connection:
+            return self._register(log, log_paths, {})
+
+    def register_file(self, logfile):
+        """Add an existing log file in json format to the store.
+
+        Parameters
+        ----------
+        logfile : str or Path
+            Path of the log.
+
+        Returns
+        -------
+        int
+            The id of the run.
+        """
+        log, log_format=logfiles.read_log(logfile)
+        if log_format!="json":
+            raise ValueError(f"Only logs in json format can be registered: {logfile}")
+        return self.register(log, [logfile])
+
+    def _runs(self, query, parameters):
+        rows=self._connection.execute(query, parameters).fetchall()
+        return [self._get_run(row) for row in rows]
+
+    def _get_run(self, row):
+        run=dict(row)
+        run["arguments"]=json.loads(run["arguments"])
+        run["logs"]=[r["path"] for r in self._connection.execute("SELECT path FROM logs WHERE run_id=? ORDER BY path", (run["id"],))]
+        run["output_files"]=[dict(r) for r in self._connection.execute("SELECT path, hash, algorithm FROM output_files WHERE run_id=?", (run["id"],))]
+        run["dependencies"]=[r["log_path"] for r in self._connection.execute("SELECT log_path FROM dependencies WHERE run_id=?", (run["id"],))]
+        return run
+
+    def get_options(self, run_id):
+        """Get the options of a run as nested dictionary."""
+        tree=TreeNode()
+        for row in self._connection.execute("SELECT key, value FROM options WHERE run_id=?", (run_id,)):
+            keys=json.loads(row["key"])
+            node=tree
+            for k in keys:
+                node=node.children.setdefault(k, TreeNode())
+            node.value=json.loads(row["value"])
+        return tree.to_leafdict()
+
+    def find_runs_by_output_hash(self, file_hash):
+        """Get all runs which produced an output file with the given hash.
+
+        Returns
+        -------
+        list of dict
+            The runs, with the keys of the log (without options and dependencies) as well as "id", "logs", "output_files" and "dependencies".
+        """
+        return self._runs("SELECT DISTINCT runs.* FROM runs JOIN output_files ON output_files.run_id=runs.id WHERE output_files.hash=? ORDER BY runs.id", (file_hash,))
+
+    def find_runs_by_output(self, path):
+        """Get all runs which produced the given output file."""
+        return self._runs("SELECT DISTINCT runs.* FROM runs JOIN output_files ON output_files.run_id=runs.id WHERE output_files.path=? ORDER BY runs.id", (str(Path(path).resolve()),))
+
+    def find_runs_by_option(self, value, *keys):
+        """Get all runs where the option with the given keys has the given value."""
+        return self._runs("SELECT DISTINCT runs.* FROM runs JOIN options ON options.run_id=runs.id WHERE options.key=? AND options.value=? ORDER BY runs.id", (json.dumps(list(keys)), json.dumps(value, default=logfiles.json_default)))
+
+    def ancestors(self, path):
+        """Get all runs the given output file or log depends on, including the runs which produced it.
+
+        Parameters
+        ----------
+        path : str or Path
+            Path of an output file or a log.
+
+        Returns
+        -------
+        list of dict
+            The runs, see `find_runs_by_output_hash()`.
+        """
+        return self._runs(_ANCESTORS+"SELECT runs.* FROM runs JOIN related ON related.id=runs.id ORDER BY runs.id", {"path": str(Path(path).resolve())})
+
+    def descendants(self, path):
+        """Get all runs which depend on the given output file or log.
+
+        A run depends on a file, if one of its dependency logs lists the file as output or is the file itself.
+
+        Parameters
+        ----------
+        path : str or Path
+            Path of an output file or a log.
+
+        Returns
+        -------
+        list of dict
+            The runs, see `find_runs_by_output_hash()`.
+        """
+        return self._runs(_DESCENDANTS+"SELECT runs.* FROM runs JOIN related ON related.id=runs.id ORDER BY runs.id", {"path": str(Path(path).resolve())})
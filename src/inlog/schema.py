@@ -0,0 +1,143 @@
+import copy
+import dataclasses
+import typing
+
+_MISSING=object()
+
+def _convert_bool(val):
+    if isinstance(val, str):
+        return val.lower() in ("true", "yes", "1", "t") #same as Logger.convert_type
+    return bool(val)
+
+class Field(object):
+    """Declaration of a single option in a Schema."""
+
+    def __init__(self, type=None, default=_MISSING, array=False, sep=",", removeSpaces=False, validate=None, default_factory=None):
+        """
+        Parameters
+        ----------
+        type : function, optional
+            Type conversion function, like in `Logger.convert_type()`. If None, the value is not converted. (default: None)
+        default : object, optional
+            Value used if the option is missing. Without default or default_factory, the option is required. Each Logger gets its own copy of the value.
+        array : bool, optional
+            Convert a string to a list, like `Logger.convert_array()`. Lists are converted element-wise. (default: False)
+        sep : str, optional
+            The separator between array values. (default: ',')
+        removeSpaces : bool, optional
+            Remove spaces in the array elements. (default: False)
+        validate : function, optional
+            Function which takes the converted value and returns False if it is invalid. (default: None)
+        default_factory : function, optional
+            Function without arguments, called for each missing option to create its value, like in dataclasses. (default: None)
+        """
+        self.type=type
+        self.default=default
+        self.array=array
+        self.sep=sep
+        self.removeSpaces=removeSpaces
+        self.validate=validate
+        self.default_factory=default_factory
+
+    @property
+    def required(self):
+        return self.default is _MISSING and self.default_factory is None
+
+    def make_default(self):
+        """Create the value of a missing option. Mutable defaults are copied, so they are not shared between Loggers."""
+        if self.default_factory is not None:
+            return self.default_factory()
+        return copy.deepcopy(self.default)
+
+    def compile(self):
+        """Get a single function which converts and validates a value."""
+        dtype=self.type
+        if dtype is bool:
+            dtype=_convert_bool
+        if self.array:
+            sep=self.sep
+            removeSpaces=self.removeSpaces
+            element_type=dtype if dtype is not None else (lambda x: x)
+            def convert(val):
+                if isinstance(val, str):
+                    val=val.split(sep)
+                    if removeSpaces:
+                        val=[x.strip() for x in val]
+                    val=[a for a in val if a]
+                elif not isinstance(val, (list, tuple)):
+                    raise ValueError(f"Option {val} is not a string. Cannot convert to array.")
+                return [element_type(a) for a in val]
+        elif dtype is not None:
+            convert=dtype
+        else:
+            convert=lambda val: val
+        validate=self.validate
+        if validate is None:
+            return convert
+        def convert_validate(val):
+            val=convert(val)
+            if not validate(val):
+                raise ValueError(f"Invalid value {val!r}")
+            return val
+        return convert_validate
+
+class Schema(object):
+    """Types, defaults and validation of options, applied with `Logger.apply_schema()`.
+
+    A schema is compiled once when it is created and can be applied to any number of Loggers.
+
+    Examples
+    --------
+    >>> schema=Schema({"section1": {"start": int, "stop": Field(int, default=10), "factors": Field(float, array=True)}})
+    >>> config.apply_schema(schema)
+    """
+
+    def __init__(self, spec):
+        """
+        Parameters
+        ----------
+        spec : dict or dataclass
+            Nested dictionary of options. Values are Fields, conversion functions (short for Field(function)) or dictionaries for subtrees.
+            Keys can also be tuples of keys, for the path to an option.
+            Alternatively, a dataclass with annotated types and defaults. Dataclass types are subtrees and list[type] are arrays.
+        """
+        if dataclasses.is_dataclass(spec):
+            spec=self._dataclass_spec(spec)
+        self.fields={}
+        stack=[((), spec)]
+        while stack:
+            prefix, d=stack.pop()
+            for k, v in d.items():
+                keys=prefix+(k if isinstance(k, tuple) else (k,))
+                if isinstance(v, dict):
+                    stack.append((keys, v))
+                elif isinstance(v, Field):
+                    self.fields[keys]=v
+                elif callable(v):
+                    self.fields[keys]=Field(v)
+                else:
+                    raise TypeError(f"Invalid schema entry for {keys}: {v!r}")
+        #paths, conversion functions and functions which create defaults (None for required options), in a form which can be applied without further lookups
+        self.compiled=[(keys, field.compile(), None if field.required else field.make_default) for keys, field in self.fields.items()]
+
+    @classmethod
+    def _dataclass_spec(cls, dataclass):
+        spec={}
+        hints=typing.get_type_hints(dataclass)
+        for f in dataclasses.fields(dataclass):
+            dtype=hints.get(f.name, f.type)
+            if dataclasses.is_dataclass(dtype):
+                spec[f.name]=cls._dataclass_spec(dtype)
+                continue
+            default=_MISSING
+            default_factory=None
+            if f.default is not dataclasses.MISSING:
+                default=f.default
+            elif f.default_factory is not dataclasses.MISSING:
+                default_factory=f.default_factory
+            if typing.get_origin(dtype) in (list, tuple):
+                args=typing.get_args(dtype)
+                spec[f.name]=Field(args[0] if args else None, default=default, array=True, default_factory=default_factory)
+            else:
+                spec[f.name]=Field(dtype if typing.get_origin(dtype) is None and callable(dtype) else None, default=default, default_factory=default_factory)
+        return spec
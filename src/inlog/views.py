@@ -0,0 +1,186 @@
+from collections.abc import Mapping
+
+class OptionsView(Mapping):
+    """Read-only view of a subtree of the options of a Logger.
+
+    The view does not copy any options. Keys are resolved in the path index of the Logger on every access, so the view always reflects the current options.
+    Only leaf options read through the view are marked as accessed. Subtrees are returned as views again, without marking anything.
+    """
+
+    def __init__(self, logger, keys=()):
+        """
+        Parameters
+        ----------
+        logger : Logger
+            The Logger with the options.
+        keys : tuple, optional
+            The key path of the subtree. (default: ())
+        """
+        self._logger=logger
+        self._keys=tuple(keys)
+
+    def _node(self):
+        return self._logger._nodes[self._logger._lookup(self._keys)]
+
+    def __getitem__(self, key):
+        keys=self._keys+(key,)
+        logger=self._logger
+        node_id=logger._lookup(keys)
+        node=logger._nodes[node_id]
+        if node.children:
+            return OptionsView(logger, keys)
+        logger._accessed[node_id]=1
+        return node.value
+
+    def __iter__(self):
+        return iter(list(self._node().children))
+
+    def __len__(self):
+        return len(self._node().children)
+
+    def __contains__(self, key):
+        return self._keys+(key,) in self._logger._index
+
+    def to_dict(self):
+        """Get the subtree as nested dictionary and mark all its options as accessed, like `Logger.get()`."""
+        return self._logger.get(*self._keys)
+
+    def __repr__(self):
+        return f"OptionsView({self._logger._get(*self._keys)!r})"
+
+class _AccessRecorder(object):
+    """Access state shared by all nodes of a frozen snapshot."""
+
+    def __init__(self, logger=None, paths=()):
+        self.logger=logger
+        self.paths=set(paths)
+
+    def record(self, keys):
+        self.paths.add(keys)
+        if self.logger is not None and keys in self.logger._index: #the options might have changed since freezing
+            self.logger._accessed[self.logger._index[keys]]=1
+
+class _FrozenDict(Mapping):
+    """Immutable, hashable dictionary, for dictionaries in the values of frozen options."""
+
+    def __init__(self, values):
+        self._values=values
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __hash__(self):
+        return hash(frozenset(self._values.items()))
+
+    def __repr__(self):
+        return repr(self._values)
+
+def _freeze_value(value):
+    """Convert a value to an immutable and hashable value: lists and arrays to tuples, dictionaries to _FrozenDict and sets to frozensets."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze_value(v) for v in value)
+    if isinstance(value, dict):
+        return _FrozenDict({k: _freeze_value(v) for k, v in value.items()})
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze_value(v) for v in value)
+    if hasattr(value, "tolist") and hasattr(value, "shape"): #numpy arrays, e.g. from convert_array(as_numpy=True)
+        return _freeze_value(value.tolist())
+    return value
+
+def _freeze(node, keys, recorder):
+    """Create a FrozenOptions snapshot of the subtree of a TreeNode."""
+    root=FrozenOptions({}, keys, recorder)
+    stack=[(node, root)]
+    while stack:
+        node, frozen=stack.pop()
+        values=frozen._values
+        for k, v in node.children.items():
+            if v.children:
+                child=values[k]=FrozenOptions({}, frozen._keys+(k,), recorder)
+                stack.append((v, child))
+            else:
+                values[k]=_freeze_value(v.value)
+    return root
+
+def _unpickle_frozen(leafs, keys, paths):
+    from inlog.Tree import TreeNode
+    return _freeze(TreeNode.from_leafdict(leafs), keys, _AccessRecorder(paths=paths))
+
+class FrozenOptions(Mapping):
+    """Immutable, hashable snapshot of a subtree of the options of a Logger, see `Logger.freeze()`.
+
+    Options can be read as attributes or with brackets, subtrees are FrozenOptions again.
+    On the first read, an attribute is stored in the instance, so later reads cost as much as a plain attribute access.
+    Options whose names collide with methods of Mapping (e.g. 'keys' or 'get') or which are no identifiers can only be read with brackets.
+
+    Reading an option marks it as accessed in the Logger which created the snapshot. Values are frozen recursively: lists and numpy arrays to tuples, dictionaries to immutable mappings and sets to frozensets.
+    Pickled snapshots keep the accessed options, but lose the connection to the Logger. Use `Logger.record_access()` to merge their accessed options back.
+    """
+
+    def __init__(self, values, keys, recorder):
+        object.__setattr__(self, "_values", values)
+        object.__setattr__(self, "_keys", keys)
+        object.__setattr__(self, "_recorder", recorder)
+        object.__setattr__(self, "_recorded", set())
+
+    def __getitem__(self, key):
+        value=self._values[key]
+        if key not in self._recorded and not isinstance(value, FrozenOptions):
+            self._recorded.add(key)
+            self._recorder.record(self._keys+(key,))
+        return value
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name not in self._values:
+            raise AttributeError(f"{type(self).__name__} has no option or attribute '{name}'")
+        value=self[name]
+        object.__setattr__(self, name, value)
+        return value
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenOptions):
+            return NotImplemented
+        return self._values==other._values
+
+    def __hash__(self):
+        return hash(frozenset(self._values.items()))
+
+    def _to_leafdict(self):
+        """Nested dictionary of all options, without marking them as accessed."""
+        return {k: v._to_leafdict() if isinstance(v, FrozenOptions) else v for k, v in self._values.items()}
+
+    def to_dict(self):
+        """Get the snapshot as nested dictionary and mark all its options as accessed."""
+        for k, v in self._values.items():
+            if isinstance(v, FrozenOptions):
+                v.to_dict()
+            else:
+                self[k]
+        return self._to_leafdict()
+
+    def __reduce__(self):
+        return (_unpickle_frozen, (self._to_leafdict(), self._keys, self._recorder.paths))
+
+    def __repr__(self):
+        return f"FrozenOptions({self._to_leafdict()!r})"
@@ -0,0 +1,210 @@
+#Tests for hashing of output files
+import unittest as ut
+from unittest import mock
+from inlog import hashing
+from inlog.Logger import Logger
+from pathlib import Path
+import hashlib
+import os
+import tempfile
+import json
+import time
+import inlog
+
+def age(*files):
+    """Set the modification time of files into the past, such that their cache entries are not racy."""
+    for f in files:
+        os.utime(f, (time.time()-3600, time.time()-3600))
+
+class TestHashCache(ut.TestCase):
+    def setUp(self):
+        self.tempdir=tempfile.TemporaryDirectory()
+        self.dir=Path(self.tempdir.name)
+        self.datafile=self.dir/"data.txt"
+        self.datafile.write_text("abc")
+        age(self.datafile)
+        self.cache=hashing.HashCache(self.dir/"cache")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_hash_file(self):
+        self.assertEqual(hashing.hash_file(self.datafile), hashlib.sha256(b"abc").hexdigest())
+        data=os.urandom(100000)
+        self.datafile.write_bytes(data)
+        for block_size in [None, 1, 4096, 1<<20]:
+            self.assertEqual(hashing.hash_file(self.datafile, block_size=block_size), hashlib.sha256(data).hexdigest())
+        empty=self.dir/"empty.txt"
+        empty.touch()
+        self.assertEqual(hashing.hash_file(empty, block_size=16), hashlib.sha256(b"").hexdigest())
+
+    def test_cache_hit(self):
+        expected=hashlib.sha256(b"abc").hexdigest()
+        self.assertIsNone(self.cache.lookup(self.datafile))
+        self.assertEqual(self.cache.hash_file(self.datafile), expected)
+        self.assertEqual(self.cache.lookup(self.datafile), expected)
+        with mock.patch.object(hashing, "hash_file") as hash_mock:
+            self.assertEqual(self.cache.hash_file(self.datafile), expected)
+            hash_mock.assert_not_called()
+        #the cache is persistent
+        cache2=hashing.HashCache(self.dir/"cache")
+        self.assertEqual(cache2.lookup(self.datafile), expected)
+
+    def test_stale_entry(self):
+        self.cache.hash_file(self.datafile)
+        self.datafile.write_text("abcd")
+        self.assertIsNone(self.cache.lookup(self.datafile))
+        self.assertEqual(self.cache.hash_file(self.datafile), hashlib.sha256(b"abcd").hexdigest())
+
+    def test_racy_entry(self):
+        stat=self.datafile.stat()
+        with mock.patch.object(hashing.time, "time", return_value=stat.st_mtime_ns/1e9+1):
+            self.cache.hash_file(self.datafile)
+        #same size and modification time, e.g. within the timestamp granularity of the file system
+        self.datafile.write_text("abd")
+        os.utime(self.datafile, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(hashing.file_state(self.datafile.stat()), hashing.file_state(stat))
+        self.assertIsNone(self.cache.lookup(self.datafile))
+        self.assertEqual(self.cache.hash_file(self.datafile), hashlib.sha256(b"abd").hexdigest())
+        #entries stored long enough after the modification are trusted
+        self.assertEqual(self.cache.lookup(self.datafile), hashlib.sha256(b"abd").hexdigest())
+
+    def test_default_cache_dir(self):
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(self.dir)}):
+            os.environ.pop("INLOG_CACHE_DIR", None)
+            self.assertEqual(hashing.default_cache_dir(), self.dir/"inlog")
+            for value in ["", "relative/cache"]:
+                os.environ["XDG_CACHE_HOME"]=value
+                self.assertEqual(hashing.default_cache_dir(), Path.home()/".cache"/"inlog")
+
+    def test_evict_error(self):
+        cache=hashing.HashCache(self.dir/"cache", max_entries=1)
+        other=self.dir/"other.txt"
+        other.write_text("def")
+        cache.hash_file(self.datafile)
+        cache.hash_file(other)
+        with mock.patch.object(cache, "evict", side_effect=OSError("read-only")):
+            with self.assertWarns(UserWarning):
+                self.assertEqual(cache.hash_file(self.datafile, "blake2b"), hashlib.blake2b(b"abc").hexdigest())
+        #the cache is disabled, but hashing still works
+        self.assertIsNone(cache.lookup(self.datafile))
+        self.assertEqual(cache.hash_file(self.datafile), hashlib.sha256(b"abc").hexdigest())
+
+    def test_evict(self):
+        cache=hashing.HashCache(self.dir/"cache", max_entries=2)
+        files=[self.dir/f"data{i}.txt" for i in range(5)]
+        for i, f in enumerate(files):
+            f.write_text(str(i))
+            age(f)
+            cache.hash_file(f)
+        cache.evict()
+        self.assertEqual(len(cache.path.read_text().splitlines()), 2)
+        self.assertIsNone(cache.lookup(files[0]))
+        self.assertIsNotNone(cache.lookup(files[-1]))
+
+    def test_logger(self):
+        logger=Logger({"a": 1}, hash_cache=self.cache)
+        logger.set_outfile(self.datafile)
+        logger._create_log_dict()
+        self.assertIsNotNone(self.cache.lookup(self.datafile))
+        logger=Logger({"a": 1}, hash_cache=False)
+        self.assertIsNone(logger.hash_cache)
+        self.assertEqual(logger.hash_file(self.datafile), hashlib.sha256(b"abc").hexdigest())
+
+    def test_hash_files(self):
+        files=[self.dir/f"data{i}.txt" for i in range(10)]
+        for i, f in enumerate(files):
+            f.write_text(str(i))
+        age(*files)
+        expected=[hashlib.sha256(str(i).encode()).hexdigest() for i in range(10)]
+        self.assertEqual(hashing.hash_files(files, max_workers=4), expected)
+        self.assertEqual(hashing.hash_files(files, cache=self.cache, max_workers=4), expected)
+        self.assertEqual(self.cache.lookup(files[3]), expected[3])
+        self.assertEqual(hashing.hash_files(files, max_workers=2, executor="process"), expected)
+        self.assertRaises(ValueError, hashing.hash_files, files, max_workers=2, executor="invalid")
+        logger=Logger(hash_cache=False, hash_workers=4)
+        logger.set_outfile(files)
+        self.assertEqual([f["hash"] for f in logger._create_log_dict()["output_files"]], expected)
+
+    def test_algorithms(self):
+        self.assertEqual(hashing.hash_file(self.datafile, "blake2b"), hashlib.blake2b(b"abc").hexdigest())
+        self.assertEqual(hashing.hash_file(self.datafile, "blake2b", block_size=2), hashlib.blake2b(b"abc").hexdigest())
+        self.assertRaises(ValueError, hashing.hash_file, self.datafile, "invalid")
+        #the cache distinguishes between algorithms
+        self.cache.hash_file(self.datafile)
+        self.assertIsNone(self.cache.lookup(self.datafile, "blake2b"))
+        self.assertEqual(self.cache.hash_file(self.datafile, "blake2b"), hashlib.blake2b(b"abc").hexdigest())
+        self.assertEqual(self.cache.lookup(self.datafile), hashlib.sha256(b"abc").hexdigest())
+        #the algorithm is written to the log
+        logger=Logger(hash_cache=False, hash_algorithm="blake2b")
+        logger.set_outfile(self.datafile)
+        entry=logger._create_log_dict()["output_files"][0]
+        self.assertEqual(entry["algorithm"], "blake2b")
+        self.assertEqual(entry["hash"], hashlib.blake2b(b"abc").hexdigest())
+        entry=logger._create_log_dict(hash_algorithm="sha256")["output_files"][0]
+        self.assertEqual(entry["algorithm"], "sha256")
+        self.assertIn("<ALGORITHM> blake2b\n", logger._to_string())
+        with self.assertRaises(ValueError):
+            logger.write_log(self.datafile, hash_algorithm="invalid")
+
+    def test_background_hashing(self):
+        logger=Logger(hash_cache=False, background_hashing=True)
+        logger.add_outfile(self.datafile)
+        path=self.datafile.resolve()
+        self.assertIn(path, logger._hash_futures)
+        self.assertEqual(logger._collect_hash(path, "sha256"), hashlib.sha256(b"abc").hexdigest())
+        self.assertIsNone(logger._collect_hash(path, "blake2b"))
+        self.assertEqual(logger._create_log_dict()["output_files"][0]["hash"], hashlib.sha256(b"abc").hexdigest())
+        #modified files are hashed again
+        self.datafile.write_text("abcd")
+        os.utime(self.datafile, ns=(0, 0))
+        self.assertIsNone(logger._collect_hash(path, "sha256"))
+        self.assertEqual(logger._create_log_dict()["output_files"][0]["hash"], hashlib.sha256(b"abcd").hexdigest())
+
+    def test_fingerprint(self):
+        data=os.urandom(10000)
+        self.datafile.write_bytes(data)
+        #small files are hashed completely
+        fingerprint=hashing.fingerprint_file(self.datafile, chunks=2, chunk_size=5000)
+        self.assertEqual(fingerprint, hashlib.sha256(len(data).to_bytes(8, "little")+data).hexdigest())
+        #only chunks of large files are hashed
+        fingerprint=hashing.fingerprint_file(self.datafile, chunks=2, chunk_size=100)
+        self.datafile.write_bytes(data[:150]+b"x"+data[151:])
+        self.assertEqual(hashing.fingerprint_file(self.datafile, chunks=2, chunk_size=100), fingerprint)
+        self.datafile.write_bytes(b"x"+data[1:])
+        self.assertNotEqual(hashing.fingerprint_file(self.datafile, chunks=2, chunk_size=100), fingerprint)
+        self.datafile.write_bytes(data+b"x")
+        self.assertNotEqual(hashing.fingerprint_file(self.datafile, chunks=2, chunk_size=100), fingerprint)
+        #fingerprints and full hashes are cached separately
+        self.assertEqual(hashing.hash_files([self.datafile], cache=self.cache, fingerprint=(2, 100)), [hashing.fingerprint_file(self.datafile, chunks=2, chunk_size=100)])
+        self.assertIsNone(self.cache.lookup(self.datafile))
+
+    def test_verify_log(self):
+        logger=Logger(hash_cache=False, hash_mode="fingerprint")
+        logger.set_outfile(self.datafile)
+        entry=logger._create_log_dict()["output_files"][0]
+        self.assertEqual(entry["fingerprint"], {"chunks": hashing.FINGERPRINT_CHUNKS, "chunk_size": hashing.FINGERPRINT_CHUNK_SIZE})
+        self.assertIn("<FINGERPRINT>", "".join(logger._to_string()))
+        logger.write_log(self.datafile)
+        logfile=self.dir/"data.txt.log"
+        path=str(self.datafile.resolve())
+        self.assertEqual(inlog.verify_log(logfile), {path: True})
+        self.assertEqual(inlog.verify_log(logfile, upgrade=True), {path: True})
+        with open(logfile) as f:
+            entry=json.load(f)["output_files"][0]
+        self.assertNotIn("fingerprint", entry)
+        self.assertEqual(entry["hash"], hashlib.sha256(b"abc").hexdigest())
+        self.assertEqual(inlog.verify_log(logfile), {path: True})
+        self.datafile.write_text("abcd")
+        self.assertEqual(inlog.verify_log(logfile), {path: False})
+        self.datafile.unlink()
+        self.assertEqual(inlog.verify_log(logfile), {path: False})
+        self.assertRaises(ValueError, Logger(hash_mode="invalid")._get_fingerprint)
+
+    def test_opt_out(self):
+        with mock.patch.dict(os.environ, {"INLOG_HASH_CACHE": "0"}):
+            self.assertIsNone(hashing.default_cache())
+            self.assertIsNone(Logger().hash_cache)
+
+if __name__ == '__main__':
+    ut.main()
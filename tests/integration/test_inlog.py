@@ -3,6 +3,27 @@ import unittest as ut
 from inlog.Logger import Logger
 from pathlib import Path
 import tempfile
+import json
+from unittest import mock
+from inlog import logfiles, flowchart, hashing
+from inlog.provenance import ProvenanceStore
+import asyncio
+import os
+
+_patches=[]
+
+def setUpModule():
+    #keep the persistent hash cache of the user out of the tests
+    cache_dir=tempfile.TemporaryDirectory()
+    _patches.extend([mock.patch.dict(os.environ, {"INLOG_CACHE_DIR": cache_dir.name}), mock.patch.object(hashing, "_default_cache", None)])
+    for patch in _patches:
+        patch.start()
+    _patches.append(cache_dir)
+
+def tearDownModule():
+    _patches.pop().cleanup()
+    while _patches:
+        _patches.pop().stop()
 
 class TestLogger(ut.TestCase):
     def setUp(self):
@@ -23,6 +44,179 @@ class TestLogger(ut.TestCase):
                 self.assertTrue('    "output_files": [],\n'in lines)
                 self.assertTrue('        "a": 1\n' in lines)
     
+    def test_write_log_many(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            datafiles=[Path(tempdir)/f"data{i}.txt" for i in range(3)]
+            logfiles_new=[Path(tempdir)/f"data{i}.txt.log" for i in range(3)]
+            logger=self.get_test_logger()
+            #encoded once
+            with mock.patch.object(json, "dumps", wraps=json.dumps) as dumps_mock:
+                logger.write_log(datafiles)
+            self.assertEqual(dumps_mock.call_count, 1)
+            with mock.patch.object(Logger, "_create_log_txt", autospec=True, side_effect=Logger._create_log_txt) as txt_mock:
+                logger.write_log(datafiles, format="txt")
+            self.assertEqual(txt_mock.call_count, 1)
+            contents=[f.read_bytes() for f in logfiles_new]
+            self.assertEqual(contents[0], contents[1])
+            self.assertEqual(contents[0], contents[2])
+            logger.write_log(datafiles, link="hardlink")
+            self.assertEqual(logfiles_new[0].stat().st_ino, logfiles_new[2].stat().st_ino)
+            #rewriting one of the logs does not change the others
+            logger.get("a")
+            logger.write_log(datafiles[1])
+            self.assertNotEqual(logfiles_new[1].read_bytes(), logfiles_new[0].read_bytes())
+            self.assertEqual(logfiles_new[2].read_bytes(), logfiles_new[0].read_bytes())
+            logger.write_log(datafiles, link="symlink")
+            self.assertTrue(logfiles_new[1].is_symlink())
+            self.assertEqual(logfiles_new[1].read_bytes(), logfiles_new[0].read_bytes())
+            logger.write_log(datafiles[1])
+            self.assertFalse(logfiles_new[1].is_symlink())
+            #links which cannot be created are replaced by copies
+            with mock.patch.object(logfiles.os, "link", side_effect=OSError):
+                logger.write_log(datafiles, link="hardlink")
+            self.assertNotEqual(logfiles_new[0].stat().st_ino, logfiles_new[2].stat().st_ino)
+            self.assertEqual(logfiles_new[2].read_bytes(), logfiles_new[0].read_bytes())
+            self.assertRaises(ValueError, logger.write_log, datafiles, link="invalid")
+            self.assertEqual(sorted(p.name for p in Path(tempdir).iterdir()), [f.name for f in logfiles_new])
+
+    def test_write_log_stream(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            tempdir=Path(tempdir)
+            logger=Logger({"a": 1, "b": {"c": [1, 2], "d": "ä\"x"}, "e": {}, 3: None}, "1.0")
+            logger.get("b", "c")
+            (tempdir/"out.txt").write_text("data")
+            logger.set_outfile(tempdir/"out.txt")
+            (tempdir/"text.txt.log").write_text("<Date> today\n\nline \"2\"")
+            (tempdir/"empty.txt.log").write_text("")
+            logger.write_log(tempdir/"json.txt", old_logs=[tempdir/"text.txt", tempdir/"empty.txt"])
+            (tempdir/"brace.txt.log").write_text("{not json\nline2\n")
+            (tempdir/"truncated.txt.log").write_text((tempdir/"json.txt.log").read_text()[:-20])
+            (tempdir/"compact.txt.log").write_text('{"a": [1, {"b": "\\u00e4"}], "c": {}}')
+            header={"date": "today", "program": "test.py", "arguments": ["-x", "1"], "version": "1.0", "input": "None", "runtime": "0:00:00"}
+            old_logs=[tempdir/name for name in ("json.txt", "text.txt", "brace.txt", "truncated.txt", "compact.txt")]
+            with mock.patch.object(Logger, "_create_log_header", side_effect=lambda: dict(header)):
+                for accessed_only in (True, False):
+                    for old in (old_logs, None):
+                        logger.write_log(tempdir/"full.txt", old_logs=old, accessed_only=accessed_only)
+                        logger.write_log([tempdir/"stream1.txt", tempdir/"stream2.txt"], old_logs=old, accessed_only=accessed_only, stream=True)
+                        self.assertEqual((tempdir/"stream1.txt.log").read_bytes(), (tempdir/"full.txt.log").read_bytes())
+                        self.assertEqual((tempdir/"stream2.txt.log").read_bytes(), (tempdir/"full.txt.log").read_bytes())
+                logger._reset_access()
+                logger.write_log(tempdir/"full.txt")
+                logger.write_log(tempdir/"stream1.txt", stream=True)
+                self.assertEqual((tempdir/"stream1.txt.log").read_bytes(), (tempdir/"full.txt.log").read_bytes())
+            self.assertRaises(ValueError, logger.write_log, tempdir/"stream1.txt", dependency_mode="reference", stream=True)
+            self.assertRaises(ValueError, logger.write_log, tempdir/"stream1.txt", provenance=tempdir/"prov.db", stream=True)
+
+    def test_write_log_background(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            tempdir=Path(tempdir)
+            logger=self.get_test_logger()
+            logger.get("a")
+            header=logger._create_log_header()
+            with mock.patch.object(Logger, "_create_log_header", side_effect=lambda: dict(header)):
+                logger.write_log(tempdir/"sync.txt")
+                logger.write_log(tempdir/"sync.txt", format="txt", file_ext="txt.log")
+                future=logger.write_log(tempdir/"background.txt", background=True)
+                logger.write_log(tempdir/"background.txt", format="txt", file_ext="txt.log", background=True)
+            #changes after the call are not in the log
+            logger.set(100, "a")
+            logger.set_subtree({"x": 1}, "b")
+            logger.get("e")
+            logger.flush()
+            self.assertTrue(future.done())
+            self.assertEqual((tempdir/"background.txt.log").read_bytes(), (tempdir/"sync.txt.log").read_bytes())
+            self.assertEqual((tempdir/"background.txt.txt.log").read_bytes(), (tempdir/"sync.txt.txt.log").read_bytes())
+            #writes happen in the order of the calls
+            for i in range(10):
+                logger.set(i, "a")
+                logger.write_log(tempdir/"order.txt", background=True)
+            logger.flush()
+            with open(tempdir/"order.txt.log", "r") as f:
+                self.assertEqual(json.load(f)["options"]["a"], 9)
+            #errors are raised by flush
+            logger.write_log(tempdir/"error.txt", old_logs=tempdir/"missing.txt", background=True)
+            self.assertRaises(FileNotFoundError, logger.flush)
+            logger.flush()
+            self.assertRaises(ValueError, logger.write_log, tempdir/"error.txt", format="invalid", background=True)
+            with ProvenanceStore(tempdir/"prov.db") as store:
+                self.assertRaises(ValueError, logger.write_log, tempdir/"error.txt", provenance=store, background=True)
+            logger.write_log(tempdir/"prov.txt", provenance=tempdir/"prov.db", background=True)
+            #asyncio
+            async def write():
+                task=logger.write_log_async(tempdir/"async.txt")
+                logger.set(-1, "a")
+                await task
+            asyncio.run(write())
+            with open(tempdir/"async.txt.log", "r") as f:
+                self.assertEqual(json.load(f)["options"]["a"], 9)
+            logger.close()
+            with ProvenanceStore(tempdir/"prov.db") as store:
+                self.assertEqual(len(store.find_runs_by_option(9, "a")), 1)
+            self.assertFalse(any(p.name.endswith(".tmp") for p in tempdir.iterdir()))
+
+    def test_write_log_dependency_cache(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            tempdir=Path(tempdir)
+            logfiles.clear_dependency_cache()
+            logger=self.get_test_logger()
+            logger.write_log(tempdir/"json.txt")
+            (tempdir/"text.txt.log").write_text("line1\nline \"2\"\n")
+            old_logs=[tempdir/"json.txt", tempdir/"text.txt"]
+            logger.write_log(tempdir/"new0.txt", old_logs=old_logs, cache_dependencies=True)
+            with mock.patch.object(logfiles, "_read_dependency", wraps=logfiles._read_dependency) as read_mock:
+                for i in range(1, 4):
+                    logger.write_log(tempdir/f"new{i}.txt", old_logs=old_logs, cache_dependencies=True)
+                self.assertEqual(read_mock.call_count, 0)
+                #changed logs are read again
+                logger.get("a")
+                logger.write_log(tempdir/"json.txt")
+                logger.write_log(tempdir/"new4.txt", old_logs=old_logs, cache_dependencies=True)
+                self.assertEqual(read_mock.call_count, 1)
+                #without cache_dependencies, the cache is neither used nor filled
+                logfiles.clear_dependency_cache()
+                logger.write_log(tempdir/"new5.txt", old_logs=old_logs)
+                self.assertEqual(read_mock.call_count, 3)
+                self.assertEqual(len(logfiles._dependency_cache), 0)
+            #the embedded dependencies are the same as with json.dumps of the complete log
+            text=(tempdir/"new4.txt.log").read_text()
+            log=json.loads(text)
+            self.assertEqual(text, json.dumps(log, indent=4))
+            self.assertEqual(log["dependencies"][str(old_logs[1].resolve())+".log"], {"text": ["line1\n", "line \"2\"\n"]})
+            self.assertEqual(log["dependencies"][str(old_logs[0].resolve())+".log"]["options"], {"a": 1})
+            with mock.patch.object(logfiles, "DEPENDENCY_CACHE_SIZE", 1):
+                logger.write_log(tempdir/"new6.txt", old_logs=old_logs, cache_dependencies=True)
+                self.assertEqual(len(logfiles._dependency_cache), 1)
+            self.assertEqual(json.loads((tempdir/"new6.txt.log").read_text())["dependencies"], json.loads((tempdir/"new5.txt.log").read_text())["dependencies"])
+
+    def test_read_log(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            tempdir=Path(tempdir)
+            cases={
+                "json.log": ('\n  {"a": [1, 2]}\n', {"a": [1, 2]}, "json"),
+                "text.log": ('\n<Date> today\n{"a": 1}\n', {"text": ["\n", "<Date> today\n", '{"a": 1}\n']}, "txt"),
+                "brace.log": ('{ no json\nline2', {"text": ["{ no json\n", "line2"]}, "txt"),
+                "empty.log": ('', {"text": []}, "txt"),
+                "list.log": ('\n[1, 2]\n', [1, 2], "json"),
+                "number.log": ('-1.5', -1.5, "json"),
+                "digit.log": ('1 line\n', {"text": ["1 line\n"]}, "txt"),
+            }
+            for name, (content, log, log_format) in cases.items():
+                (tempdir/name).write_text(content)
+                with mock.patch("builtins.open", wraps=open) as open_mock:
+                    self.assertEqual(logfiles.read_log(tempdir/name), (log, log_format))
+                self.assertEqual(open_mock.call_count, 1)
+                self.assertEqual(list(logfiles.iter_dependency_json(tempdir/name, pad="  ")), json.dumps(log, indent=4).replace("\n", "\n  ").split("\n"))
+            self.assertRaises(ValueError, hashing.verify_log, tempdir/"text.log")
+            with ProvenanceStore(tempdir/"prov.db") as store:
+                self.assertRaises(ValueError, store.register_file, tempdir/"brace.log")
+            #json logs with any top level value are embedded as json
+            for stream in [False, True]:
+                datafile=tempdir/f"data{stream}.txt"
+                self.get_test_logger().write_log(datafile, old_logs=[tempdir/"list"], stream=stream)
+                with open(tempdir/f"data{stream}.txt.log") as f:
+                    self.assertEqual(list(json.load(f)["dependencies"].values()), [[1, 2]])
+
     def test_write_log_deprecation(self):
         #Test if a deprecation warning is raised if only a file with replaced extension exists
         #This was the default before version 2.2.0
@@ -39,6 +233,26 @@ class TestLogger(ut.TestCase):
             #assert that the new log file is created
             self.assertTrue(logfile.exists())
 
+    def test_write_log_reference(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            datafiles=[Path(tempdir)/f"data{i}.txt" for i in range(5)]
+            logger=self.get_test_logger()
+            logger.write_log(datafiles[0], dependency_mode='reference')
+            for i in range(1, 5):
+                logger.write_log(datafiles[i], old_logs=datafiles[i-1], dependency_mode='reference')
+            with open(Path(tempdir)/"data4.txt.log", "r") as file:
+                log=json.load(file)
+            self.assertEqual(len(log[logfiles.STORE_KEY]), 4)
+            self.assertTrue(logfiles.is_reference(log["dependencies"][str(Path(tempdir).resolve()/"data3.txt.log")]))
+            expanded=logfiles.expand_log(log)
+            self.assertEqual(len(expanded["dependencies"]), 1)
+            self.assertNotIn(logfiles.STORE_KEY, json.dumps(expanded))
+            #flowchart can follow references
+            result=[]
+            flowchart.make_nodes(log, "data4.txt.log", result)
+            self.assertEqual(len([l for l in result if "-->" in l]), 5)
+            self.assertRaises(ValueError, logger.write_log, datafiles[0], dependency_mode='invalid')
+
 
 
 if __name__ == '__main__':
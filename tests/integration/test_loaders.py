@@ -0,0 +1,75 @@
+#Tests for loading config files from disk
+import unittest as ut
+from unittest import mock
+from pathlib import Path
+import os
+import tempfile
+import json
+import inlog
+from inlog import loaders, hashing
+
+_patches=[]
+
+def setUpModule():
+    #keep the persistent hash cache of the user out of the tests
+    cache_dir=tempfile.TemporaryDirectory()
+    _patches.extend([mock.patch.dict(os.environ, {"INLOG_CACHE_DIR": cache_dir.name}), mock.patch.object(hashing, "_default_cache", None)])
+    for patch in _patches:
+        patch.start()
+    _patches.append(cache_dir)
+
+def tearDownModule():
+    _patches.pop().cleanup()
+    while _patches:
+        _patches.pop().stop()
+
+class TestParseCache(ut.TestCase):
+    def setUp(self):
+        self.tempdir=tempfile.TemporaryDirectory()
+        self.dir=Path(self.tempdir.name)
+        loaders.clear_parse_cache()
+
+    def tearDown(self):
+        loaders.clear_parse_cache()
+        self.tempdir.cleanup()
+
+    def check_cache(self, load, parser, file, content, modified):
+        file.write_text(content)
+        logger1=load(file, cache=True)
+        with mock.patch.object(*parser) as parser_mock:
+            logger2=load(file, cache=True)
+            parser_mock.assert_not_called()
+        self.assertEqual(logger2.get("section1", "start"), logger1.get("section1", "start"))
+        #the Loggers are independent
+        logger1.set("x", "section1", "start")
+        self.assertNotEqual(logger2.get("section1", "start"), "x")
+        self.assertNotEqual(load(file, cache=True).get("section1", "start"), "x")
+        #modified files are parsed again
+        file.write_text(modified)
+        os.utime(file, ns=(0, 0))
+        self.assertEqual(load(file, cache=True).get("section1", "start"), load(file).get("section1", "start"))
+        self.assertNotEqual(load(file, cache=True).get("section1", "start"), logger2.get("section1", "start"))
+
+    def test_ini(self):
+        self.check_cache(inlog.load_ini, (loaders, "_configparser_to_dict"), self.dir/"config.ini", "[section1]\nstart=1\n", "[section1]\nstart=2\n")
+        self.assertRaises(FileNotFoundError, inlog.load_ini, self.dir/"missing.ini", cache=True)
+
+    @ut.skipIf(not loaders._has_yaml, "pyyaml is not installed")
+    def test_yaml(self):
+        self.check_cache(inlog.load_yaml, (loaders.yaml, "load"), self.dir/"config.yaml", "section1:\n  start: 1\n", "section1:\n  start: 2\n")
+
+    def test_json(self):
+        self.check_cache(inlog.load_json, (loaders.json, "load"), self.dir/"config.json", json.dumps({"section1": {"start": 1}}), json.dumps({"section1": {"start": 2}}))
+
+    def test_lru(self):
+        files=[self.dir/f"config{i}.json" for i in range(3)]
+        for f in files:
+            f.write_text(json.dumps({"a": 1}))
+        with mock.patch.object(loaders, "PARSE_CACHE_SIZE", 2):
+            for f in files:
+                inlog.load_json(f, cache=True)
+        self.assertEqual(len(loaders._parse_cache), 2)
+        self.assertNotIn(str(files[0].resolve()), [key[1] for key in loaders._parse_cache])
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,114 @@
+#Tests for the provenance database
+import unittest as ut
+from inlog.Logger import Logger
+from inlog.provenance import ProvenanceStore
+from pathlib import Path
+import hashlib
+import tempfile
+import os
+from unittest import mock
+from inlog import hashing
+from inlog.Tree import TreeNode
+import sys
+
+_patches=[]
+
+def setUpModule():
+    #keep the persistent hash cache of the user out of the tests
+    cache_dir=tempfile.TemporaryDirectory()
+    _patches.extend([mock.patch.dict(os.environ, {"INLOG_CACHE_DIR": cache_dir.name}), mock.patch.object(hashing, "_default_cache", None)])
+    for patch in _patches:
+        patch.start()
+    _patches.append(cache_dir)
+
+def tearDownModule():
+    _patches.pop().cleanup()
+    while _patches:
+        _patches.pop().stop()
+
+class TestProvenanceStore(ut.TestCase):
+    def setUp(self):
+        self.tempdir=tempfile.TemporaryDirectory()
+        self.dir=Path(self.tempdir.name).resolve()
+        self.store=ProvenanceStore(self.dir/"provenance.db")
+
+    def tearDown(self):
+        self.store.close()
+        self.tempdir.cleanup()
+
+    def run_step(self, name, inputs, dependency_mode='embed', provenance=None):
+        """Simulate a program creating the output file 'name' from the given input files."""
+        data=self.dir/name
+        data.write_text(name)
+        logger=Logger({"section": {"name": name, "factor": 2}}, "1.0", hash_cache=False)
+        logger.get("section")
+        logger.set_outfile(data)
+        logger.write_log(data, old_logs=[self.dir/i for i in inputs], dependency_mode=dependency_mode, provenance=self.store if provenance is None else provenance)
+        return data
+
+    def create_pipeline(self, dependency_mode='embed'):
+        #a -> b -> d
+        #c ------/
+        self.run_step("a.dat", [], dependency_mode)
+        self.run_step("b.dat", ["a.dat"], dependency_mode)
+        self.run_step("c.dat", [], dependency_mode)
+        self.run_step("d.dat", ["b.dat", "c.dat"], dependency_mode)
+
+    def programs(self, runs):
+        return sorted(Path(r["output_files"][0]["path"]).name for r in runs)
+
+    def test_queries(self):
+        self.create_pipeline()
+        self.assertEqual(len(self.store._connection.execute("SELECT * FROM runs").fetchall()), 4)
+        runs=self.store.find_runs_by_output_hash(hashlib.sha256(b"b.dat").hexdigest())
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(runs[0]["version"], "1.0")
+        self.assertEqual(runs[0]["logs"], [str(self.dir/"b.dat.log")])
+        self.assertEqual(runs[0]["dependencies"], [str(self.dir/"a.dat.log")])
+        self.assertEqual(self.store.get_options(runs[0]["id"]), {"section": {"name": "b.dat", "factor": 2}})
+        self.assertEqual(self.programs(self.store.find_runs_by_output(self.dir/"c.dat")), ["c.dat"])
+        self.assertEqual(self.programs(self.store.find_runs_by_option("c.dat", "section", "name")), ["c.dat"])
+        self.assertEqual(self.programs(self.store.ancestors(self.dir/"d.dat")), ["a.dat", "b.dat", "c.dat", "d.dat"])
+        self.assertEqual(self.programs(self.store.ancestors(self.dir/"b.dat.log")), ["a.dat", "b.dat"])
+        self.assertEqual(self.programs(self.store.descendants(self.dir/"a.dat")), ["b.dat", "d.dat"])
+        self.assertEqual(self.programs(self.store.descendants(self.dir/"c.dat.log")), ["d.dat"])
+        self.assertEqual(self.store.descendants(self.dir/"d.dat"), [])
+
+    def test_flatten(self):
+        leafs=[]
+        ProvenanceStore._flatten(TreeNode.from_leafdict({"a": {"b": 1, "c": {"d": 2}}, "e": 3}), (), leafs)
+        self.assertEqual(leafs, [(["a", "b"], 1), (["a", "c", "d"], 2), (["e"], 3)])
+        #deeper than the recursion limit
+        depth=sys.getrecursionlimit()*2
+        d=1
+        for _ in range(depth):
+            d={"a": d}
+        leafs=[]
+        ProvenanceStore._flatten(TreeNode.from_leafdict(d), (), leafs)
+        self.assertEqual(leafs, [(["a"]*depth, 1)])
+
+    def test_reference_mode(self):
+        self.create_pipeline(dependency_mode='reference')
+        self.assertEqual(self.programs(self.store.ancestors(self.dir/"d.dat")), ["a.dat", "b.dat", "c.dat", "d.dat"])
+        self.assertEqual(self.programs(self.store.descendants(self.dir/"a.dat")), ["b.dat", "d.dat"])
+
+    def test_register_file(self):
+        """Existing logs can be added later. Registering a log again does not create new runs."""
+        self.create_pipeline()
+        self.store.close()
+        self.store=ProvenanceStore(self.dir/"provenance2.db")
+        self.store.register_file(self.dir/"d.dat.log")
+        self.assertEqual(self.programs(self.store.ancestors(self.dir/"d.dat")), ["a.dat", "b.dat", "c.dat", "d.dat"])
+        self.store.register_file(self.dir/"b.dat.log")
+        self.assertEqual(len(self.store._connection.execute("SELECT * FROM runs").fetchall()), 4)
+
+    def test_write_log_path(self):
+        self.store.close()
+        self.run_step("a.dat", [], provenance=self.dir/"provenance.db")
+        self.store=ProvenanceStore(self.dir/"provenance.db")
+        self.assertEqual(self.programs(self.store.find_runs_by_output(self.dir/"a.dat")), ["a.dat"])
+        logger=Logger()
+        self.assertRaises(ValueError, logger.write_log, self.dir/"a.dat", format='txt', provenance=self.store)
+
+if __name__ == '__main__':
+    ut.main()
@@ -1,5 +1,7 @@
 import unittest as ut
 import inlog
+import math
+from inlog import loaders
 from io import StringIO
 
 class TestLogger(ut.TestCase):
@@ -15,6 +17,7 @@ class TestLogger(ut.TestCase):
         self.assertEqual(logger.get("section1", "start"), "1")
         self.assertEqual(logger.get("section1", "intermediate"), "abc.dat")
         self.assertEqual(logger.get("section2", "foo"), "2")
+        self.assertEqual(logger.loader, "configparser")
         self.assertRaises(FileNotFoundError, inlog.load_ini, "does/not/exist.ini", "1.0")
     
     def test_load_yaml(self):
@@ -29,6 +32,10 @@ class TestLogger(ut.TestCase):
         self.assertEqual(logger.get("section1", "start"), 1)
         self.assertEqual(logger.get("section1", "intermediate"), "abc.dat")
         self.assertEqual(logger.get("section2", "foo"), 2)
+        if loaders.yaml.__with_libyaml__:
+            self.assertEqual(logger.loader, "yaml.CSafeLoader")
+        else:
+            self.assertEqual(logger.loader, "yaml.SafeLoader")
         self.assertRaises(FileNotFoundError, inlog.load_yaml, "does/not/exist.ini", "1.0")
     
     def test_load_json(self):
@@ -48,10 +55,15 @@ class TestLogger(ut.TestCase):
         self.assertEqual(logger.get("section1", "start"), 1)
         self.assertEqual(logger.get("section1", "intermediate"), "abc.dat")
         self.assertEqual(logger.get("section2", "foo"), 2)
+        self.assertEqual(logger.loader, "orjson" if loaders._has_orjson else "json")
         self.assertRaises(FileNotFoundError, inlog.load_json, "does/not/exist.ini", "1.0")
         f_json=StringIO(json_string)
         logger=inlog.load_json(f_json)
         self.assertEqual(logger.version, None)
+        #values which are only supported by the json module
+        logger=inlog.load_json(StringIO('{"a": NaN}'))
+        self.assertTrue(math.isnan(logger.get("a")))
+        self.assertEqual(logger.loader, "json")
     
     def test_default_ini(self):
         """Test that default values are used if not present in the config file"""
@@ -0,0 +1,44 @@
+import unittest as ut
+from inlog import logfiles
+
+class TestLogfiles(ut.TestCase):
+    def get_chain(self, n):
+        """Logs of a linear pipeline with n steps, with embedded dependencies."""
+        log={"program": "step0.py", "dependencies": {}}
+        for i in range(1, n):
+            log={"program": f"step{i}.py", "dependencies": {f"step{i-1}.log": log}}
+        return log
+
+    def test_to_reference_log(self):
+        log=self.get_chain(4)
+        ref_log=logfiles.to_reference_log(log)
+        self.assertEqual(len(ref_log[logfiles.STORE_KEY]), 3)
+        dep=ref_log["dependencies"]["step2.log"]
+        self.assertTrue(logfiles.is_reference(dep))
+        dep_log=logfiles.resolve_dependency(dep, ref_log[logfiles.STORE_KEY])
+        self.assertEqual(dep_log["program"], "step2.py")
+        self.assertTrue(logfiles.is_reference(dep_log["dependencies"]["step1.log"]))
+        self.assertEqual(logfiles.expand_log(ref_log), log)
+
+    def test_shared_ancestors(self):
+        """Common ancestors are stored only once."""
+        base=self.get_chain(2)
+        log={"program": "merge.py", "dependencies": {"a.log": {"program": "a.py", "dependencies": {"base.log": base}}, "b.log": {"program": "b.py", "dependencies": {"base.log": base}}}}
+        ref_log=logfiles.to_reference_log(log)
+        self.assertEqual(len(ref_log[logfiles.STORE_KEY]), 4)
+        self.assertEqual(logfiles.expand_log(ref_log), log)
+
+    def test_nested_reference_logs(self):
+        """Logs which already have referenced dependencies are merged into the new store."""
+        ref_log=logfiles.to_reference_log(self.get_chain(3))
+        log={"program": "step3.py", "dependencies": {"step2.log": ref_log, "text.log": {"text": ["python3 script.py\n"]}}}
+        ref_log2=logfiles.to_reference_log(log)
+        self.assertEqual(len(ref_log2[logfiles.STORE_KEY]), 4)
+        self.assertEqual(logfiles.expand_log(ref_log2), logfiles.expand_log(log))
+        self.assertEqual(logfiles.expand_log(ref_log2)["dependencies"]["step2.log"], self.get_chain(3))
+
+    def test_missing_reference(self):
+        self.assertRaises(KeyError, logfiles.resolve_dependency, {logfiles.REF_KEY: "abc"}, {})
+
+if __name__ == '__main__':
+    ut.main()
@@ -1,6 +1,16 @@
 import unittest as ut
 from inlog.Logger import Logger
 from pathlib import Path
+from inlog.Tree import TreeNode
+import random
+import sys
+from unittest import mock
+try:
+    import numpy as np
+except ImportError:
+    np=None
+import pickle
+from collections.abc import Mapping
 
 class TestLogger(ut.TestCase):
     def setUp(self):
@@ -24,6 +34,94 @@ class TestLogger(ut.TestCase):
         self.assertRaises(KeyError, self.logger._get, "f")
         self.assertRaises(KeyError, self.logger._get, "b", "e")
     
+    def test_get_many(self):
+        logger=self.get_test_logger()
+        self.assertEqual(logger.get_many("a", ("b", "c"), ("e",)), (1, 2, {"f": "4.0", "g": "4.0, 5.0,6.0,"}))
+        self.assertTrue(logger.is_accessed("b", "c"))
+        self.assertFalse(logger.is_accessed("b", "d"))
+        self.assertTrue(logger.is_accessed("e", "f"))
+        self.assertEqual(logger.get_many({"x": ("b", "d"), "y": "a"}), {"x": 3.0, "y": 1})
+        self.assertEqual(logger.get_many(), ())
+        with self.assertRaises(KeyError):
+            logger.get_many("a", ("b", "x"))
+
+    def test_view(self):
+        logger=self.get_test_logger()
+        view=logger.view()
+        self.assertEqual(len(view), 3)
+        self.assertEqual(list(view), ["a", "b", "e"])
+        self.assertIn("b", view)
+        self.assertNotIn("x", view)
+        self.assertRaises(KeyError, view.__getitem__, "x")
+        section=view["b"]
+        self.assertIsInstance(section, Mapping)
+        self.assertFalse(logger.is_accessed("b"))
+        #only leafs which are read are marked as accessed
+        self.assertEqual(section["c"], 2)
+        self.assertTrue(logger.is_accessed("b", "c"))
+        self.assertFalse(logger.is_accessed("b", "d"))
+        self.assertEqual(logger.get_accessed_options(), {"b": {"c": 2}})
+        self.assertEqual(dict(logger.view("b")), {"c": 2, "d": 3.0})
+        self.assertTrue(logger.is_accessed("b", "d"))
+        self.assertEqual(logger.view("a"), 1)
+        with self.assertRaises(TypeError):
+            section["c"]=3
+        #the view reflects changes
+        logger.set(5, "b", "c")
+        self.assertEqual(section["c"], 5)
+        self.assertEqual(section.to_dict(), {"c": 5, "d": 3.0})
+
+    def test_freeze(self):
+        logger=Logger({"a": 1, "b": {"c": 2, "d": [1, 2]}, "e": {"not identifier": 3}})
+        frozen=logger.freeze()
+        self.assertFalse(logger.is_accessed("a"))
+        self.assertEqual(frozen.a, 1)
+        self.assertIn("a", vars(frozen)) #cached for fast access
+        self.assertTrue(logger.is_accessed("a"))
+        self.assertEqual(frozen.b.d, (1, 2))
+        self.assertFalse(logger.is_accessed("b", "c"))
+        self.assertEqual(frozen["e"]["not identifier"], 3)
+        self.assertEqual(logger.get_accessed_options(), {"a": 1, "b": {"d": [1, 2]}, "e": {"not identifier": 3}})
+        self.assertRaises(AttributeError, getattr, frozen, "x")
+        with self.assertRaises(AttributeError):
+            frozen.a=2
+        #snapshots do not change with the logger
+        logger.set(5, "a")
+        self.assertEqual(frozen.a, 1)
+        self.assertEqual(logger.freeze("a"), 5)
+        #hashable
+        self.assertEqual(hash(logger.freeze("b")), hash(Logger({"c": 2, "d": [1, 2]}).freeze()))
+        self.assertEqual(logger.freeze("b"), Logger({"c": 2, "d": [1, 2]}).freeze())
+        self.assertEqual(len({logger.freeze(), logger.freeze()}), 1)
+        self.assertEqual(repr(logger.freeze("e")), "FrozenOptions({'not identifier': 3})")
+        #values are frozen recursively
+        frozen=Logger({"a": [{"x": [1, {"y": 2}]}], "b": 1}).freeze()
+        hash(frozen)
+        self.assertEqual(frozen.a, ({"x": (1, {"y": 2})},))
+        with self.assertRaises(TypeError):
+            frozen.a[0]["x"]=2
+        self.assertEqual(pickle.loads(pickle.dumps(frozen)), frozen)
+        if np is not None:
+            logger=Logger({"a": "1,2"})
+            logger.convert_array(int, "a", as_numpy=True)
+            frozen=logger.freeze()
+            self.assertEqual(frozen.a, (1, 2))
+            self.assertEqual(hash(frozen), hash(Logger({"a": [1, 2]}).freeze()))
+
+    def test_freeze_pickle(self):
+        logger=self.get_test_logger()
+        frozen=pickle.loads(pickle.dumps(logger.freeze()))
+        self.assertEqual(frozen.b.c, 2)
+        self.assertFalse(logger.is_accessed("b", "c"))
+        #nested snapshots share the accessed options
+        logger.record_access(pickle.loads(pickle.dumps(frozen.e)))
+        self.assertTrue(logger.is_accessed("b", "c"))
+        self.assertFalse(logger.is_accessed("a"))
+        self.assertEqual(frozen.to_dict()["e"], {"f": "4.0", "g": "4.0, 5.0,6.0,"})
+        logger.record_access(frozen)
+        self.assertTrue(logger.is_accessed("a"))
+        self.assertTrue(logger.is_accessed("e", "g"))
+
     def test_set(self):
         logger=self.get_test_logger()
         logger.set(4, "b", "c")
@@ -37,12 +135,61 @@ class TestLogger(ut.TestCase):
     
     def test_set_subtree(self):
         logger=self.get_test_logger()
+        logger.get("a")
         logger.set_subtree({"c": 5, "e":5}, "b")
+        self.assertTrue(logger.is_accessed("a"))
+        self.assertFalse(logger.is_accessed("b"))
+        self.assertTrue(logger.is_accessed("b", "e"))
         self.assertEqual(logger.get("b", "c"),5)
         self.assertEqual(logger.get("b", "e"),5)
         self.assertRaises(KeyError, logger.get, "b", "d")
     
     
+    def test_shared_defaults(self):
+        defaults=TreeNode.from_leafdict({"a": 1, "b": {"c": 2, "d": {"e": 3}}, "f": "1,2"})
+        logger1=Logger({"a": 4}, def_opts=defaults)
+        logger2=Logger(def_opts=defaults)
+        self.assertTrue(defaults.shared)
+        self.assertIs(logger1.options.get("b"), defaults.get("b"))
+        self.assertEqual(logger1.get("a"), 4)
+        self.assertEqual(logger2.get("a"), 1)
+        #modifications copy only the path to the modified node
+        logger1.set(5, "b", "d", "e")
+        logger1["c"]=6
+        logger1.convert_array(int, "f")
+        logger2.set_subtree({"x": 7}, "b", "d")
+        self.assertEqual(logger1.get(), {"a": 4, "b": {"c": 6, "d": {"e": 5}}, "f": [1, 2]})
+        self.assertEqual(logger2.get(), {"a": 1, "b": {"c": 2, "d": {"x": 7}}, "f": "1,2"})
+        self.assertEqual(defaults.to_leafdict(), {"a": 1, "b": {"c": 2, "d": {"e": 3}}, "f": "1,2"})
+        self.assertIs(logger2.options.get("f"), defaults.get("f"))
+        for logger in [logger1, logger2]:
+            for keys, node_id in logger._index.items():
+                self.assertIs(logger._nodes[node_id], logger.options.get(*keys))
+        #a shared config
+        logger=Logger(TreeNode.from_leafdict({"a": {"b": "1"}}))
+        logger.convert_type(int, "a")
+        self.assertEqual(logger.get("a", "b"), 1)
+        logger.set_subtree(defaults, "a")
+        logger.set(0, "a", "b", "c")
+        self.assertEqual(defaults.get("b", "c").value, 2)
+
+    def test_index(self):
+        """The path index is consistent with the options tree after structural changes."""
+        logger=self.get_test_logger()
+        def check():
+            for keys, node_id in logger._index.items():
+                self.assertIs(logger._nodes[node_id], logger.options.get(*keys))
+            self.assertEqual(len(logger._index), len(logger._nodes))
+        check()
+        logger.set_subtree({"x": {"y": 1}, "z": 2}, "b")
+        check()
+        self.assertEqual(logger.get("b", "x", "y"), 1)
+        self.assertRaises(KeyError, logger.get, "b", "c")
+        logger.set(5, "b")
+        check()
+        self.assertRaises(KeyError, logger.get, "b", "x")
+        self.assertEqual(logger.get("b"), 5)
+
     def test_get_item(self):
         logger=Logger({"a": 1, "b": {"c": {"b":2}}, "c": {"b": 3}})
         self.assertEqual(logger["a"],1)
@@ -54,6 +201,19 @@ class TestLogger(ut.TestCase):
         self.assertRaises(KeyError,logger.__getitem__, ("d"))
         self.assertRaises(KeyError,logger.__getitem__, ("a","b"))
 
+    def test_get_item_index(self):
+        """Bracket access gives the same results as a depth-first search, also after changing the tree."""
+        logger=Logger({"a": 1, "b": {"c": {"b":2}}, "c": {"b": 3}})
+        for keys in [("a",), ("b",), ("c",), ("c", "b"), ("b", "b")]:
+            self.assertEqual(logger[keys], logger.options.match_depth_first(*keys).to_leafdict())
+            self.assertTrue(logger.is_accessed(*logger._match(keys)))
+        logger.set_subtree({"x": {"c": 4}}, "b")
+        self.assertEqual(logger["c"], 4)
+        self.assertEqual(logger["c", "b"], 3)
+        logger.set(5, "b")
+        self.assertEqual(logger["c"], {"b": 3})
+        self.assertRaises(KeyError, logger.__getitem__, "x")
+
     def test_set_item(self):
         logger=Logger({"a": 1, "b": {"c": {"b":2}}, "c": {"b": 3}})
         logger["a"]=5
@@ -97,6 +257,18 @@ class TestLogger(ut.TestCase):
         self.logger.get("b")
         self.assertTrue(self.logger.is_accessed("b"))
         self.assertTrue(self.logger.is_accessed("b", "c"))
+
+    def test_accessed_deprecated(self):
+        self.logger._reset_access()
+        self.logger.get("b")
+        with self.assertWarns(DeprecationWarning):
+            accessed=self.logger.accessed
+        self.assertEqual(accessed.to_leafdict(), {"a": False, "b": {"c": True, "d": True}, "e": {"f": False, "g": False}})
+        self.assertTrue(accessed.get("b").value)
+        self.assertFalse(accessed.value)
+        #the tree is a copy
+        accessed.get("a").value=True
+        self.assertFalse(self.logger.is_accessed("a"))
     
     def test_get_accessed_options(self):
         self.logger._reset_access()
@@ -111,6 +283,36 @@ class TestLogger(ut.TestCase):
         self.assertEqual(self.logger.get_accessed_options("b") , {"c": 2})
         self.assertEqual(self.logger.get_accessed_options() , {"a":1, "b":{"c": 2}})
     
+    def test_accessed_options_reference(self):
+        """Compare the access tracking with a mirrored tree of access flags, as used in previous versions."""
+        rng=random.Random(0)
+        def random_dict(depth):
+            return {f"k{i}": random_dict(depth-1) if depth>0 and rng.random()<0.5 else i for i in range(rng.randint(1, 4))}
+        for _ in range(20):
+            config=random_dict(4)
+            logger=Logger(config)
+            accessed=TreeNode.from_leafdict(config)
+            accessed.set_all(False)
+            paths=list(logger._index)
+            for keys in rng.sample(paths, min(len(paths), 3)):
+                logger.get(*keys)
+                accessed.set_all(True, *keys)
+            #replacing a subtree by a leaf keeps it in the accessed options, if any of its options was accessed
+            for keys in rng.sample(paths[1:], min(len(paths)-1, 2)):
+                if keys not in logger._index:
+                    continue
+                logger.set("v", *keys)
+                node=accessed.get(*keys)
+                if node.children and node.filter_any() is not None:
+                    node.value=True
+                node.children={}
+            paths=list(logger._index)
+            for keys in paths:
+                self.assertEqual(logger.is_accessed(*keys), accessed.get(*keys).value)
+                state=accessed.get(*keys).filter_any()
+                expected=None if state is None else logger.options.get(*keys).select(state).to_leafdict()
+                self.assertEqual(logger.get_accessed_options(*keys), expected)
+
     def test_convert_type(self):
         logger=self.get_test_logger()
         #convert to str
@@ -139,7 +341,41 @@ class TestLogger(ut.TestCase):
         self.assertEqual(logger.get("e", "f"),[4.0])
         self.assertEqual(logger.get("e", "g"),[4.0, 5.0, 6.0])
 
-    
+    @ut.skipIf(np is None, "numpy is not installed")
+    def test_convert_array_numpy(self):
+        logger=self.get_test_logger()
+        logger.convert_array(float, "e", as_numpy=True)
+        g=logger.get("e", "g")
+        self.assertIsInstance(g, np.ndarray)
+        self.assertEqual(g.dtype, np.float64)
+        self.assertEqual(g.tolist(), [4.0, 5.0, 6.0])
+        logger=Logger({"a": "1, 2", "b": "x, y", "c": "1,,2", "d": "1.5"})
+        logger.convert_array(np.int32, "a", as_numpy=True)
+        self.assertEqual(logger.get("a").dtype, np.int32)
+        logger.convert_array(float, "c", as_numpy=True)
+        self.assertEqual(logger.get("c").tolist(), [1.0, 2.0])
+        self.assertRaises(ValueError, logger.convert_array, int, "d", as_numpy=True)
+        logger.convert_array(Path, "b", removeSpaces=True, as_numpy=True)
+        self.assertEqual(logger.get("b").tolist(), [Path("x"), Path("y")])
+        #arrays are written as lists
+        self.assertIn('        1,\n', logger._to_string())
+        #integers out of range are not saturated or wrapped
+        logger=Logger({"a": "9999999999999999999999,1", "b": "300,1", "c": "-99999999999999999999999", "d": "0, 255", "e": "-1", "f": "9223372036854775807,-9223372036854775808"})
+        self.assertRaises(OverflowError, logger.convert_array, int, "a", as_numpy=True)
+        self.assertRaises(OverflowError, logger.convert_array, np.int8, "b", as_numpy=True)
+        self.assertRaises(OverflowError, logger.convert_array, int, "c", as_numpy=True)
+        self.assertRaises(OverflowError, logger.convert_array, np.uint8, "e", as_numpy=True)
+        logger.convert_array(np.uint8, "d", as_numpy=True)
+        self.assertEqual(logger.get("d").tolist(), [0, 255])
+        logger.convert_array(int, "f", as_numpy=True)
+        self.assertEqual(logger.get("f").tolist(), [9223372036854775807, -9223372036854775808])
+
+    def test_convert_array_no_numpy(self):
+        with mock.patch.object(sys.modules[Logger.__module__], "_has_numpy", False):
+            logger=self.get_test_logger()
+            logger.convert_array(float, "e", "g", as_numpy=True)
+        self.assertEqual(logger.get("e", "g"),[4.0, 5.0, 6.0])
+
     def test_create_log_dict(self):
         self.logger._reset_access()
         self.logger.get("b", "c")
@@ -0,0 +1,95 @@
+import unittest as ut
+import dataclasses
+import typing
+from pathlib import Path
+from inlog.Logger import Logger
+from inlog.Tree import TreeNode
+from inlog.schema import Schema, Field
+
+@dataclasses.dataclass
+class Section(object):
+    start: int
+    factors: typing.List[float]
+    verbose: bool=False
+
+@dataclasses.dataclass
+class Config(object):
+    section1: Section
+    name: str="default"
+
+@dataclasses.dataclass
+class Lists(object):
+    xs: typing.List[int]=dataclasses.field(default_factory=list)
+
+class TestSchema(ut.TestCase):
+    def get_test_logger(self):
+        return Logger({"section1": {"start": "1", "factors": "1.0, 2.0", "verbose": "yes"}, "paths": {"a": "x", "b": "y"}})
+
+    def test_apply(self):
+        logger=self.get_test_logger()
+        schema=Schema({"section1": {"start": int, "factors": Field(float, array=True), "verbose": bool, "stop": Field(int, default=10)}, ("paths",): Path})
+        logger.apply_schema(schema)
+        self.assertEqual(logger.get("section1"), {"start": 1, "factors": [1.0, 2.0], "verbose": True, "stop": 10})
+        self.assertEqual(logger.get("paths", "b"), Path("y"))
+        #defaults are not accessed
+        logger._reset_access()
+        logger.get("section1", "start")
+        self.assertEqual(logger.get_accessed_options(), {"section1": {"start": 1}})
+        #the same schema can be applied again, converted values are kept
+        logger=self.get_test_logger()
+        logger.apply_schema(schema)
+        logger.apply_schema(schema)
+        self.assertEqual(logger.get("section1", "factors"), [1.0, 2.0])
+
+    def test_errors(self):
+        logger=self.get_test_logger()
+        with self.assertRaisesRegex(ValueError, "Missing option"):
+            logger.apply_schema({"section1": {"x": int}})
+        with self.assertRaisesRegex(ValueError, "'section1', 'verbose'"):
+            logger.apply_schema({"section1": {"verbose": int}})
+        with self.assertRaisesRegex(ValueError, "Invalid option"):
+            logger.apply_schema({"section1": {"start": Field(int, validate=lambda x: x>1)}})
+        with self.assertRaisesRegex(ValueError, "is an option"):
+            logger.apply_schema({"section1": {"start": {"x": Field(int, default=1)}}})
+        self.assertRaises(TypeError, Schema, {"a": 1})
+
+    def test_new_subtree(self):
+        logger=self.get_test_logger()
+        logger.apply_schema({"new": {"a": Field(default=1), "b": Field(default=2)}, ("section1", "x", "y"): Field(default=3)})
+        self.assertEqual(logger.get("new"), {"a": 1, "b": 2})
+        self.assertEqual(logger.get("section1", "x", "y"), 3)
+        for keys, node_id in logger._index.items():
+            self.assertIs(logger._nodes[node_id], logger.options.get(*keys))
+
+    def test_shared_defaults(self):
+        defaults=TreeNode.from_leafdict({"section1": {"start": "1", "factors": "1.0"}})
+        logger=Logger(def_opts=defaults)
+        logger.apply_schema(Config)
+        self.assertEqual(logger.get(), {"section1": {"start": 1, "factors": [1.0], "verbose": False}, "name": "default"})
+        self.assertEqual(defaults.to_leafdict(), {"section1": {"start": "1", "factors": "1.0"}})
+
+    def test_dataclass(self):
+        schema=Schema(Config)
+        self.assertEqual(set(schema.fields), {("section1", "start"), ("section1", "factors"), ("section1", "verbose"), ("name",)})
+        self.assertTrue(schema.fields["section1", "factors"].array)
+        self.assertTrue(schema.fields["section1", "start"].required)
+        self.assertFalse(schema.fields["name",].required)
+        logger=self.get_test_logger()
+        logger.apply_schema(schema)
+        self.assertEqual(logger.get("section1", "verbose"), True)
+        self.assertEqual(logger.get("name"), "default")
+
+    def test_mutable_defaults(self):
+        #Loggers with the same schema do not share mutable defaults
+        for schema in (Schema(Lists), Schema({"xs": Field(default=[])}), Schema({"xs": Field(default_factory=list)})):
+            self.assertFalse(schema.fields["xs",].required)
+            a=Logger()
+            b=Logger()
+            a.apply_schema(schema)
+            b.apply_schema(schema)
+            a.get("xs").append(5)
+            self.assertEqual(b.get("xs"), [])
+            self.assertIsNot(a.get("xs"), b.get("xs"))
+
+if __name__ == '__main__':
+    ut.main()
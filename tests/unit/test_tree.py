@@ -1,4 +1,5 @@
 import unittest as ut
+import sys
 from inlog.Tree import TreeNode
 
 class TestTree(ut.TestCase):
@@ -83,6 +84,14 @@ class TestTree(ut.TestCase):
         self.assertIs(tree.match_depth_first("c","b"),tree.get("b", "c", "b"))
         self.assertIsNone(tree.match_depth_first("a","b"))
     
+    def test_match_depth_first_path(self):
+        d={"a": 1, "b": {"c": {"b":2}}, "c": {"b": 3}}
+        tree=TreeNode.from_leafdict(d)
+        self.assertEqual(tree.match_depth_first_path("c"), ("b", "c"))
+        self.assertEqual(tree.match_depth_first_path("c","b"), ("b", "c", "b"))
+        self.assertEqual(tree.match_depth_first_path(), ())
+        self.assertIsNone(tree.match_depth_first_path("a","b"))
+
     def test_filter_any(self):
         d={"a":0, "b": {"c": {"d":1}, "g": {"h":2}}, "e": {"f": 3}}
         tree=TreeNode.from_leafdict(d)
@@ -120,6 +129,55 @@ class TestTree(ut.TestCase):
         self.assertRaises(KeyError, tree_selected.get, "b", "g", "h")
         self.assertRaises(KeyError, tree_selected.get, "e", "f")
 
+    def test_deep_tree(self):
+        #deeper than the recursion limit
+        depth=sys.getrecursionlimit()*2
+        d=1
+        for _ in range(depth):
+            d={"a": d}
+        tree=TreeNode.from_leafdict(d)
+        keys=("a",)*depth
+        self.assertEqual(tree.get(*keys).value, 1)
+        leafs=tree.copy().to_leafdict()
+        for _ in range(depth):
+            leafs=leafs["a"]
+        self.assertEqual(leafs, 1)
+        tree.map(lambda x: x)
+        tree.set_all(0)
+        self.assertEqual(tree.filter_any(lambda x: True).get(*keys).value, 0)
+        self.assertEqual(tree.select(tree).get(*keys).value, 0)
+        self.assertEqual(tree.match_depth_first_path(*keys), keys)
+        self.assertEqual(len(tree.to_prettystr().splitlines()), depth+1)
+        tree.update(tree.copy())
+
+    def test_merged(self):
+        tree=TreeNode.from_leafdict({"a": {"b": 1, "c": 2}, "d": {"e": 3}})
+        tree_update=TreeNode.from_leafdict({"a": {"c": 4, "f": 5}, "g": 6})
+        merged=tree.merged(tree_update)
+        expected=tree.copy()
+        expected.update(tree_update.copy())
+        self.assertEqual(merged.to_leafdict(), expected.to_leafdict())
+        self.assertEqual(list(merged.get("a").children), ["b", "c", "f"])
+        #the inputs are not modified, unchanged subtrees are shared
+        self.assertEqual(tree.get("a", "c").value, 2)
+        self.assertNotIn("f", tree.get("a").children)
+        self.assertIs(merged.get("d"), tree.get("d"))
+        self.assertIs(merged.get("a", "f"), tree_update.get("a", "f"))
+
+    def test_share(self):
+        tree=TreeNode.from_leafdict({"a": {"b": 1}})
+        self.assertFalse(tree.get("a", "b").shared)
+        self.assertIs(tree.share(), tree)
+        self.assertTrue(tree.get("a", "b").shared)
+        copy=tree.get("a").shallow_copy()
+        self.assertFalse(copy.shared)
+        self.assertIs(copy.get("b"), tree.get("a", "b"))
+        copy.children["c"]=TreeNode(2)
+        self.assertNotIn("c", tree.get("a").children)
+
+    def test_slots(self):
+        self.assertFalse(hasattr(TreeNode(1), "__dict__"))
+
     #From Logger. Unused now. Might be a useful testcase if implemented.
     # def test_find_depth_first(self):
     #     logger=self.get_test_logger()